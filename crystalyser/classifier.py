@@ -0,0 +1,152 @@
+"""
+ Title:         CSL Classifier
+ Description:   For labelling grain boundaries with their CSL sigma values
+ References:    https://doi.org/10.1016/0001-6160(66)90168-4
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import re, numpy as np
+from crystalyser.csl import CSL_DICT, get_symmetry_quats
+from crystalyser.orientation import deg_to_rad, eulers_to_quats, get_quat_products, get_quat_conjugates
+from crystalyser.orientations import to_quats
+
+# The CSLClassifier Class
+class CSLClassifier:
+
+    def __init__(self, type:str="cubic", csl_dict:dict=CSL_DICT, max_angle:float=np.pi/12):
+        """
+        Class for classifying grain boundaries using the brandon criterion;
+        the symmetric variants of every CSL misorientation are precomputed
+
+        Parameters:
+        * `type`:      The crystal structure type
+        * `csl_dict`:  The dictionary of CSLs
+        * `max_angle`: The maximum deviation for sigma 1 (rads); the
+                       tolerance for each sigma is `max_angle/sqrt(sigma)`
+        """
+
+        # Get CSL information
+        self.symmetries = get_symmetry_quats(type)
+        self.sigma_list = list(csl_dict.keys())
+        sigma_values = [int(re.match(r"\d+", sigma).group()) for sigma in self.sigma_list]
+        self.tolerances = max_angle / np.sqrt(np.array(sigma_values))
+
+        # Determine the variants of each CSL (i.e., S_a * C * S_b and S_a * C^-1 * S_b)
+        variant_list, group_list = [], []
+        for i, sigma in enumerate(self.sigma_list):
+            csl_quat = eulers_to_quats(np.array(deg_to_rad(csl_dict[sigma]["euler"])))
+            for csl_variant in [csl_quat, get_quat_conjugates(csl_quat)]:
+                variants = get_quat_products(self.symmetries[:,None], get_quat_products(csl_variant, self.symmetries[None,:]))
+                variant_list.append(variants.reshape(-1, 4))
+                group_list.append(np.full(len(self.symmetries)**2, i))
+
+        # Remove duplicate variants (including q and -q) and group by CSL
+        variants = np.concatenate(variant_list)
+        variants = np.where(variants[:,3:] < 0, -variants, variants)
+        groups = np.concatenate(group_list)
+        _, unique_indexes = np.unique(np.column_stack([groups, np.round(variants, 8)]), axis=0, return_index=True)
+        unique_indexes = np.sort(unique_indexes)
+        self.variants = variants[unique_indexes]
+        self.variant_angles = 2 * np.arccos(np.clip(self.variants[:,3], 0, 1))
+        self.groups = groups[unique_indexes]
+
+    def get_deviations(self, eulers_1:np.ndarray, eulers_2:np.ndarray, chunk_size:int=10000) -> np.ndarray:
+        """
+        Determines the deviations of many boundaries from each CSL
+
+        Parameters:
+        * `eulers_1`:   The euler angles on the first side of the boundaries, as an (N,3) array (rads), or the orientations
+        * `eulers_2`:   The euler angles on the second side of the boundaries, as an (N,3) array (rads), or the orientations
+        * `chunk_size`: The number of boundaries to process at once
+
+        Returns the deviations as an (N,C) array (rads); deviations greater
+        than the tolerances are only bounded from below
+        """
+
+        # Get misorientations, reduced to the fundamental zone
+        deltas = get_quat_products(to_quats(eulers_2), get_quat_conjugates(to_quats(eulers_1)))
+        best = np.argmax(np.abs(deltas @ self.symmetries.T), axis=1)
+        deltas = get_quat_products(get_quat_conjugates(self.symmetries[best]), deltas)
+        delta_angles = 2 * np.arccos(np.clip(np.abs(deltas[:,3]), 0, 1))
+
+        # Iterate through chunks
+        num_csls = len(self.sigma_list)
+        deviations = np.full((len(deltas), num_csls), np.pi)
+        for start in range(0, len(deltas), chunk_size):
+            chunk_deltas = deltas[start:start+chunk_size]
+
+            # Only check variants that can be within the tolerances (by the triangle inequality)
+            max_angle = delta_angles[start:start+chunk_size].max() + self.tolerances.max() + 1e-9
+            is_near = self.variant_angles <= max_angle
+            near_groups = self.groups[is_near]
+            group_counts = np.bincount(near_groups, minlength=num_csls)
+            if group_counts.sum() == 0:
+                continue
+            group_starts = np.searchsorted(near_groups, np.arange(num_csls))
+
+            # Find the closest variant of each CSL; the sentinel column lets the
+            # starts of trailing empty groups end the last non-empty group
+            dots = np.abs(chunk_deltas @ self.variants[is_near].T)
+            dots = np.concatenate([dots, np.zeros((len(dots), 1))], axis=1)
+            max_dots = np.maximum.reduceat(dots, group_starts, axis=1)
+            max_dots = np.where(group_counts > 0, max_dots, 0)
+            deviations[start:start+chunk_size] = 2 * np.arccos(np.clip(max_dots, 0, 1))
+        return deviations
+
+    def classify(self, eulers_1:np.ndarray, eulers_2:np.ndarray, chunk_size:int=10000) -> tuple:
+        """
+        Labels many boundaries with the nearest CSL within the brandon criterion
+
+        Parameters:
+        * `eulers_1`:   The euler angles on the first side of the boundaries, as an (N,3) array (rads), or the orientations
+        * `eulers_2`:   The euler angles on the second side of the boundaries, as an (N,3) array (rads), or the orientations
+        * `chunk_size`: The number of boundaries to process at once
+
+        Returns an (N,) array of the indexes of the CSLs in `sigma_list` (-1 if
+        no CSL satisfies the criterion) and an (N,) array of the deviations (rads)
+        """
+        deviations = self.get_deviations(eulers_1, eulers_2, chunk_size)
+        deviations = np.where(deviations <= self.tolerances, deviations, np.inf)
+        indexes = np.argmin(deviations, axis=1)
+        min_deviations = deviations[np.arange(len(deviations)), indexes]
+        indexes = np.where(np.isinf(min_deviations), -1, indexes)
+        return indexes, min_deviations
+
+    def get_labels(self, indexes:np.ndarray) -> list:
+        """
+        Converts the CSL indexes into sigma labels
+
+        Parameters:
+        * `indexes`: The indexes from `classify`
+
+        Returns the list of sigma labels (None if unclassified)
+        """
+        return [self.sigma_list[index] if index >= 0 else None for index in indexes]
+
+    def get_summary(self, indexes:np.ndarray, lengths:np.ndarray=None) -> dict:
+        """
+        Summarises the classified boundaries
+
+        Parameters:
+        * `indexes`: The indexes from `classify`
+        * `lengths`: The lengths of the boundaries; counts each boundary
+                     as one unit of length if unspecified
+
+        Returns a dictionary containing the count, length, and length
+        fraction of the boundaries for each sigma
+        """
+        indexes = np.asarray(indexes)
+        lengths = np.ones(len(indexes)) if lengths is None else np.asarray(lengths, dtype=float)
+        counts = np.bincount(indexes + 1, minlength=len(self.sigma_list) + 1)
+        total_lengths = np.bincount(indexes + 1, weights=lengths, minlength=len(self.sigma_list) + 1)
+        total_length = max(total_lengths.sum(), np.finfo(float).tiny)
+        summary = {}
+        for i, sigma in enumerate([None] + self.sigma_list):
+            summary[sigma] = {
+                "count":    int(counts[i]),
+                "length":   float(total_lengths[i]),
+                "fraction": float(total_lengths[i] / total_length),
+            }
+        return summary
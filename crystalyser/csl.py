@@ -9,7 +9,9 @@
 
 # Libraries
 import numpy as np
-from crystalyser.orientation import random_euler, deg_to_rad, euler_to_matrix, matrix_to_euler, get_matrix_product
+from crystalyser.orientation import random_euler, deg_to_rad, euler_to_matrix, matrix_to_euler, get_matrix_product, eulers_to_matrices, matrices_to_eulers, random_eulers
+from crystalyser.orientation import matrices_to_quats, get_quat_products, get_quat_conjugates
+from crystalyser.orientations import to_matrices, to_quats
 
 # Dictionary of CSLs
 CSL_DICT = {
@@ -43,21 +45,52 @@ CSL_DICT = {
     "35b":  {"mori": 43.20, "euler": [30.96, 88.36, 59.04]},
 }
 
-def get_symmetry_matrices(type:str="cubic") -> list:
+def check_symmetry_type(type:str) -> None:
+    """
+    Checks that a crystal structure type is supported
+
+    Parameters:
+    * `type`: The crystal structure type
+    """
+    if not type in SYMMETRY_MATRICES:
+        raise ValueError(f"The crystal structure type '{type}' is not supported!")
+
+def get_symmetry_matrices(type:str="cubic") -> np.ndarray:
     """
     Returns the symmetry matrices
 
     Parameters:
     * `type`: The crystal structure type
 
-    Returns a list of the symmetry matrices given the type
+    Returns a read-only (G,3,3) array of the symmetry matrices given the type
     """
-    if type == "cubic":
-        return get_cubic_symmetry_matrices()
-    elif type == "hexagonal":
-        return get_hexagonal_symmetry_matrices()
-    elif type == "tetrahedral":
-        return get_tetrahedral_symmetry_matrices()
+    check_symmetry_type(type)
+    return SYMMETRY_MATRICES[type]
+
+def get_symmetry_quats(type:str="cubic") -> np.ndarray:
+    """
+    Returns the symmetry operators as quaternions
+
+    Parameters:
+    * `type`: The crystal structure type
+
+    Returns a read-only (G,4) array of the quaternions given the type
+    """
+    check_symmetry_type(type)
+    return SYMMETRY_QUATS[type]
+
+def get_symmetry_tables(type:str="cubic") -> tuple:
+    """
+    Returns the product and inverse tables of the symmetry operators
+
+    Parameters:
+    * `type`: The crystal structure type
+
+    Returns a (G,G) array of the indexes of the products of each pair of
+    operators, and a (G,) array of the indexes of the inverse of each operator
+    """
+    check_symmetry_type(type)
+    return SYMMETRY_PRODUCTS[type], SYMMETRY_INVERSES[type]
 
 def get_cubic_symmetry_matrices() -> list:
     """
@@ -125,6 +158,55 @@ def get_tetrahedral_symmetry_matrices() -> list:
         [[0,-1,0], [-1,0,0], [0,0,-1]],
     ]
 
+def get_product_table(symmetries:np.ndarray) -> np.ndarray:
+    """
+    Determines the product table of a group of symmetry matrices
+
+    Parameters:
+    * `symmetries`: The symmetry matrices, as a (G,3,3) array
+
+    Returns a (G,G) array where entry (a,b) is the index of `symmetries[a] * symmetries[b]`
+    """
+    products = np.einsum("aij,bjk->abik", symmetries, symmetries)
+    matches = np.all(np.abs(products[:,:,None] - symmetries[None,None]) < 1e-6, axis=(3,4))
+    if not np.all(matches.sum(axis=2) == 1):
+        raise ValueError("The symmetry matrices do not form a group!")
+    return np.argmax(matches, axis=2)
+
+def get_inverse_table(products:np.ndarray) -> np.ndarray:
+    """
+    Determines the inverse table of a group of symmetry matrices
+
+    Parameters:
+    * `products`: The product table of the group
+
+    Returns a (G,) array where entry a is the index of the inverse of operator a
+    """
+    identity = np.argmax(np.all(products == np.arange(len(products)), axis=1))
+    return np.argmax(products == identity, axis=1)
+
+def get_frozen(array:np.ndarray) -> np.ndarray:
+    """
+    Makes an array read-only
+
+    Parameters:
+    * `array`: The array
+
+    Returns the read-only array
+    """
+    array.setflags(write=False)
+    return array
+
+# Precomputed symmetry operators and tables
+SYMMETRY_MATRICES = {
+    "cubic":       get_frozen(np.array(get_cubic_symmetry_matrices(), dtype=float)),
+    "hexagonal":   get_frozen(np.array(get_hexagonal_symmetry_matrices(), dtype=float)),
+    "tetrahedral": get_frozen(np.array(get_tetrahedral_symmetry_matrices(), dtype=float)),
+}
+SYMMETRY_QUATS    = {type: get_frozen(matrices_to_quats(matrices)) for type, matrices in SYMMETRY_MATRICES.items()}
+SYMMETRY_PRODUCTS = {type: get_frozen(get_product_table(matrices)) for type, matrices in SYMMETRY_MATRICES.items()}
+SYMMETRY_INVERSES = {type: get_frozen(get_inverse_table(products)) for type, products in SYMMETRY_PRODUCTS.items()}
+
 def get_csl_euler_angles(csl_sigma:str, euler_1:list=None) -> list:
     """
     Generates two sets of euler angles that conform to CSL3
@@ -151,6 +233,41 @@ def get_csl_euler_angles(csl_sigma:str, euler_1:list=None) -> list:
     # Return
     return [euler_1, euler_2]
 
+def get_csl_euler_pairs(csl_sigmas:list, num_pairs:int, weights:list=None, rng:np.random.Generator=None) -> tuple:
+    """
+    Generates many pairs of euler angles (rads) that conform to CSLs;
+    batched version of `get_csl_euler_angles`
+
+    Parameters:
+    * `csl_sigmas`: The sigma value of the CSL, or a list of sigma values to draw from
+    * `num_pairs`:  The number of pairs to generate
+    * `weights`:    The relative weights of the sigma values; uniform if unspecified
+    * `rng`:        The random number generator; a new unseeded one if unspecified
+
+    Returns the first euler angles as an (N,3) array, the second euler angles
+    as an (N,3) array, and the sigma values of each pair as an (N,) array
+    """
+
+    # Initialise
+    rng = np.random.default_rng() if rng is None else rng
+    csl_sigmas = [csl_sigmas] if isinstance(csl_sigmas, str) else list(csl_sigmas)
+    weights = np.ones(len(csl_sigmas)) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) != len(csl_sigmas):
+        raise ValueError("Number of weights does not match the number of sigma values!")
+
+    # Draw sigma values and (uniformly) random first euler angles
+    sigma_indexes = rng.choice(len(csl_sigmas), size=num_pairs, p=weights/weights.sum())
+    eulers_1 = random_eulers(num_pairs, rng)
+
+    # Determine second euler angles
+    euler_offsets = np.array([deg_to_rad(CSL_DICT[csl_sigma]["euler"]) for csl_sigma in csl_sigmas])
+    matrix_offsets = eulers_to_matrices(euler_offsets)[sigma_indexes]
+    matrices_2 = np.matmul(matrix_offsets, eulers_to_matrices(eulers_1))
+    eulers_2 = matrices_to_eulers(matrices_2)
+
+    # Return
+    return eulers_1, eulers_2, np.array(csl_sigmas)[sigma_indexes]
+
 def get_misorientations(euler_1:list, euler_2:list, type:str) -> list:
     """
     Determines the misorientations of two sets of euler angles (rads)
@@ -163,23 +280,19 @@ def get_misorientations(euler_1:list, euler_2:list, type:str) -> list:
     Returns a list of the misorientation angles from the symmetry matrices
     """
 
-    # Get orientation and symmetry matrices
+    # Get orientation matrices and symmetry tables
     orientation_1 = np.array(euler_to_matrix(euler_1))
     orientation_2 = np.array(euler_to_matrix(euler_2))
-    symmetries = np.array(get_symmetry_matrices(type))
-
-    # Iterate through symmetry matrices
-    misorientation_list = []
-    for symmetry_1 in symmetries:
-        operator_1 = np.dot(symmetry_1, orientation_1)
-        for symmetry_2 in symmetries:
-            operator_2 = np.dot(symmetry_2, orientation_2)
-            delta = np.dot(operator_2, operator_1.T)
-            cw = 0.5 * (delta.trace() - 1)
-            if cw > 1. and cw - 1. < 10 * np.finfo("float32").eps:
-                cw = 1.
-            misorientation = np.arccos(cw)
-            misorientation_list.append(misorientation)
+    symmetries = get_symmetry_matrices(type)
+    products, inverses = get_symmetry_tables(type)
+
+    # Since symmetry_2 * delta * symmetry_1^T has the same trace as (symmetry_1^T * symmetry_2) * delta,
+    # only one trace per operator needs to be computed
+    delta = np.dot(orientation_2, orientation_1.T)
+    traces = np.einsum("kij,ji->k", symmetries, delta)
+    cw_list = 0.5 * (traces[products[inverses]].flatten() - 1)
+    cw_list = np.where((cw_list > 1.) & (cw_list - 1. < 10 * np.finfo("float32").eps), 1., cw_list)
+    misorientation_list = list(np.arccos(cw_list))
     return misorientation_list
 
 def get_disorientation(euler_1:list, euler_2:list, type:str) -> float:
@@ -197,6 +310,130 @@ def get_disorientation(euler_1:list, euler_2:list, type:str) -> float:
     misorientations += get_misorientations(euler_2, euler_1, type)
     return min(misorientations)
 
+def get_disorientations(eulers_1:np.ndarray, eulers_2:np.ndarray, type:str, chunk_size:int=10000) -> np.ndarray:
+    """
+    Determines the disorientations of many pairs of euler angles (rads);
+    vectorised version of `get_disorientation`
+
+    Parameters:
+    * `eulers_1`:   The first euler angles, as an (N,3) array (rads), or the orientations
+    * `eulers_2`:   The second euler angles, as an (N,3) array (rads), or the orientations
+    * `type`:       The crystal structure type
+    * `chunk_size`: The number of pairs to process at once
+
+    Returns the disorientation angles as an (N,) array
+    """
+
+    # Get orientation and symmetry matrices
+    orientations_1 = to_matrices(eulers_1)
+    orientations_2 = to_matrices(eulers_2)
+    symmetries = get_symmetry_matrices(type)
+    if orientations_1.shape != orientations_2.shape:
+        raise ValueError("Shapes of euler angle arrays do not match!")
+
+    # Evaluate misorientations in chunks; because the symmetry operators form a group,
+    # every pair of operators and both orderings reduce to one trace per operator
+    num_pairs = len(orientations_1)
+    disorientations = np.empty(num_pairs)
+    for start in range(0, num_pairs, chunk_size):
+        end = min(start + chunk_size, num_pairs)
+        deltas = np.matmul(orientations_2[start:end], orientations_1[start:end].transpose(0,2,1))
+        max_traces = np.einsum("kij,nji->nk", symmetries, deltas).max(axis=1)
+        cw = np.clip(0.5 * (max_traces - 1), -1, 1)
+        disorientations[start:end] = np.arccos(cw)
+    return disorientations
+
+def is_in_sector(axes:np.ndarray, type:str, tolerance:float=1e-9) -> np.ndarray:
+    """
+    Checks whether disorientation axes lie in the standard triangle (i.e.,
+    the fundamental sector) of the crystal structure
+
+    Parameters:
+    * `axes`:      The axes, as an (..., 3) array
+    * `type`:      The crystal structure type
+    * `tolerance`: The tolerance for the bounds of the sector
+
+    Returns a boolean array of whether the axes lie in the sector
+    """
+    x, y, z = axes[...,0], axes[...,1], axes[...,2]
+    if type == "cubic":
+        return (x >= y - tolerance) & (y >= z - tolerance) & (z >= -tolerance)
+    elif type == "hexagonal":
+        return (z >= -tolerance) & (y >= -tolerance) & (y <= x / np.sqrt(3) + tolerance)
+    elif type == "tetrahedral":
+        return (z >= -tolerance) & (y >= -tolerance) & (y <= x + tolerance)
+    raise ValueError(f"The crystal structure type '{type}' is not supported!")
+
+def get_quat_angles(quats_1:np.ndarray, quats_2:np.ndarray, type:str) -> np.ndarray:
+    """
+    Determines the disorientation angles of many pairs of quaternions,
+    without determining the disorientation axes
+
+    Parameters:
+    * `quats_1`: The first quaternions, as an (...,4) array of [x, y, z, w]
+    * `quats_2`: The second quaternions, as an (...,4) array of [x, y, z, w]
+    * `type`:    The crystal structure type
+
+    Returns the disorientation angles as an (...) array
+    """
+    deltas = get_quat_products(quats_2, get_quat_conjugates(quats_1))
+    max_dots = np.abs(deltas @ get_symmetry_quats(type).T).max(axis=-1)
+    return 2 * np.arccos(np.clip(max_dots, 0, 1))
+
+def get_quat_disorientations(eulers_1:np.ndarray, eulers_2:np.ndarray, type:str, chunk_size:int=100000) -> tuple:
+    """
+    Determines the disorientations of many pairs of euler angles (rads) using
+    quaternions; because the symmetry operators form a group, only one operator
+    per pair needs to be tried, rather than every pair of operators; since the
+    matrix path uses the precomputed symmetry tables, `get_disorientations` (or
+    `get_quat_angles` for quaternions) is faster when only the angles are needed
+
+    Parameters:
+    * `eulers_1`:   The first euler angles, as an (N,3) array (rads), or the orientations
+    * `eulers_2`:   The second euler angles, as an (N,3) array (rads), or the orientations
+    * `type`:       The crystal structure type
+    * `chunk_size`: The number of pairs to process at once
+
+    Returns the disorientation angles as an (N,) array and the disorientation
+    axes, reduced to the standard triangle, as an (N,3) array
+    """
+
+    # Get quaternions of orientations and symmetry operators
+    quats_1 = to_quats(eulers_1)
+    quats_2 = to_quats(eulers_2)
+    symmetries = get_symmetry_quats(type)
+    symmetry_matrices = get_symmetry_matrices(type)
+    if quats_1.shape != quats_2.shape:
+        raise ValueError("Shapes of euler angle arrays do not match!")
+
+    # Iterate through chunks
+    num_pairs = len(quats_1)
+    disorientations = np.empty(num_pairs)
+    axes = np.empty((num_pairs, 3))
+    for start in range(0, num_pairs, chunk_size):
+        end = min(start + chunk_size, num_pairs)
+
+        # Find the symmetry operator giving the smallest rotation
+        deltas = get_quat_products(quats_2[start:end], get_quat_conjugates(quats_1[start:end]))
+        dots = np.abs(deltas @ symmetries.T)
+        best = np.argmax(dots, axis=1)
+        disorientations[start:end] = 2 * np.arccos(np.clip(dots[np.arange(end-start), best], 0, 1))
+
+        # Determine the axis of the smallest rotation
+        reduced = get_quat_products(get_quat_conjugates(symmetries[best]), deltas)
+        reduced = np.where(reduced[:,3:] < 0, -reduced, reduced)
+        norms = np.linalg.norm(reduced[:,:3], axis=1, keepdims=True)
+        chunk_axes = np.divide(reduced[:,:3], norms, out=np.zeros((end-start, 3)), where=norms > 1e-12)
+
+        # Move axes into the standard triangle using the equivalent axes
+        candidates = np.einsum("gij,nj->ngi", symmetry_matrices, chunk_axes)
+        candidates = np.concatenate([candidates, -candidates], axis=1)
+        in_sector = np.argmax(is_in_sector(candidates, type), axis=1)
+        axes[start:end] = candidates[np.arange(end-start), in_sector]
+
+    # Return
+    return disorientations, axes
+
 # Testing
 # from orientation import rad_to_deg
 # euler_pairs = [
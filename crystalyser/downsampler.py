@@ -0,0 +1,231 @@
+"""
+ Title:         Downsampler
+ Description:   For reducing the number of points of curves while preserving their shapes
+ References:    https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+
+def get_uniform_indexes(num_points:int, density:int) -> np.ndarray:
+    """
+    Gets evenly spaced indexes; gives the same indexes as `get_thinned_list`
+
+    Parameters:
+    * `num_points`: The number of points before downsampling
+    * `density`:    The goal number of points
+
+    Returns the array of indexes
+    """
+    step_size = num_points / density
+    thin_indexes = np.floor(step_size * np.arange(1, density - 1)).astype(int)
+    return np.concatenate([[0], thin_indexes, [num_points - 1]])
+
+def get_minmax_indexes(y_values:np.ndarray, density:int) -> np.ndarray:
+    """
+    Gets the indexes of the minimum and maximum values of evenly sized buckets,
+    so that peaks (e.g., yield points and stress peaks) are kept
+
+    Parameters:
+    * `y_values`: The values to preserve the shape of
+    * `density`:  The goal number of points
+
+    Returns the sorted array of indexes
+    """
+
+    # Split the values into buckets, padding the last bucket
+    y_values = np.asarray(y_values, dtype=float)
+    num_buckets = max((density - 2) // 2, 1)
+    bucket_size = int(np.ceil(len(y_values) / num_buckets))
+    padded = np.full(num_buckets * bucket_size, np.nan)
+    padded[:len(y_values)] = y_values
+    buckets = padded.reshape(num_buckets, bucket_size)
+
+    # Get the extreme values of each (non-empty) bucket
+    is_filled = ~np.all(np.isnan(buckets), axis=1)
+    offsets = np.arange(num_buckets)[is_filled] * bucket_size
+    min_indexes = offsets + np.nanargmin(buckets[is_filled], axis=1)
+    max_indexes = offsets + np.nanargmax(buckets[is_filled], axis=1)
+    return np.unique(np.concatenate([[0], min_indexes, max_indexes, [len(y_values) - 1]]))
+
+def get_lttb_indexes(x_values:np.ndarray, y_values:np.ndarray, density:int) -> np.ndarray:
+    """
+    Gets the indexes of the points that best preserve the shape of a curve
+    using the largest-triangle-three-buckets algorithm
+
+    Parameters:
+    * `x_values`: The x values of the curve
+    * `y_values`: The y values of the curve
+    * `density`:  The goal number of points
+
+    Returns the sorted array of indexes
+    """
+
+    # Initialise
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = np.asarray(y_values, dtype=float)
+    num_points = len(x_values)
+    if density >= num_points or density < 3:
+        return get_uniform_indexes(num_points, min(density, num_points))
+    edges = np.floor(np.linspace(1, num_points - 1, density - 1)).astype(int)
+    indexes = np.zeros(density, dtype=int)
+    indexes[-1] = num_points - 1
+
+    # Choose the point forming the largest triangle with the previous point and next bucket average
+    for i in range(density - 2):
+        start, end = edges[i], edges[i+1]
+        next_start, next_end = edges[i+1], edges[i+2] if i + 2 < len(edges) else num_points
+        next_x = x_values[next_start:next_end].mean()
+        next_y = y_values[next_start:next_end].mean()
+        prev_x, prev_y = x_values[indexes[i]], y_values[indexes[i]]
+        areas = np.abs((prev_x - next_x) * (y_values[start:end] - prev_y)
+                       - (prev_x - x_values[start:end]) * (next_y - prev_y))
+        indexes[i+1] = start + np.argmax(areas)
+    return indexes
+
+def get_downsample_indexes(x_values:np.ndarray, y_values:np.ndarray, density:int, mode:str="uniform") -> np.ndarray:
+    """
+    Gets the indexes of the points to keep when downsampling a curve
+
+    Parameters:
+    * `x_values`: The x values of the curve
+    * `y_values`: The y values of the curve
+    * `density`:  The goal number of points
+    * `mode`:     The downsampling mode ("uniform", "minmax", or "lttb")
+
+    Returns the sorted array of indexes
+    """
+    num_points = len(y_values)
+    if num_points <= density:
+        return np.arange(num_points)
+    if mode == "uniform":
+        return get_uniform_indexes(num_points, density)
+    elif mode == "minmax":
+        return get_minmax_indexes(y_values, density)
+    elif mode == "lttb":
+        return get_lttb_indexes(x_values, y_values, density)
+    raise ValueError(f"The downsampling mode '{mode}' is not supported!")
+
+def downsample(data:np.ndarray, density:int, mode:str="uniform", x_index:int=0, y_index:int=-1) -> np.ndarray:
+    """
+    Downsamples multiple aligned columns at once
+
+    Parameters:
+    * `data`:    The columns, as an (N,K) array
+    * `density`: The goal number of points
+    * `mode`:    The downsampling mode ("uniform", "minmax", or "lttb")
+    * `x_index`: The index of the column used as the x values
+    * `y_index`: The index of the column whose shape is preserved
+
+    Returns the downsampled columns
+    """
+    data = np.asarray(data)
+    indexes = get_downsample_indexes(data[:,x_index], data[:,y_index], density, mode)
+    return data[indexes]
+
+# The StreamingDownsampler Class
+class StreamingDownsampler:
+
+    def __init__(self, bucket_size:int, mode:str="minmax", y_index:int=-1):
+        """
+        Class for downsampling columns that arrive in chunks, such that the
+        full data never needs to be held in memory; every bucket of rows is
+        reduced to its first row ("uniform") or to its minimum and maximum
+        rows ("minmax"), and the first and last rows are always kept
+
+        Parameters:
+        * `bucket_size`: The number of rows per bucket
+        * `mode`:        The downsampling mode ("uniform" or "minmax")
+        * `y_index`:     The index of the column whose shape is preserved
+        """
+        if not mode in ["uniform", "minmax"]:
+            raise ValueError(f"The streaming downsampling mode '{mode}' is not supported!")
+        self.bucket_size = bucket_size
+        self.mode = mode
+        self.y_index = y_index
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the state of the downsampler
+        """
+        self.remainder = None
+        self.offset = 0
+        self.last_kept = -1
+        self.last_row = None
+
+    def get_indexes(self, data:np.ndarray) -> np.ndarray:
+        """
+        Gets the indexes of the rows to keep; only the last bucket may be incomplete
+
+        Parameters:
+        * `data`: The rows, as an (N,K) array
+
+        Returns the sorted array of indexes
+        """
+        starts = np.arange(0, len(data), self.bucket_size)
+        if self.mode == "uniform" or len(data) == 0:
+            return starts
+
+        # Get the extreme values of the complete buckets
+        y_values = data[:,self.y_index]
+        num_complete = (len(data) // self.bucket_size) * self.bucket_size
+        buckets = y_values[:num_complete].reshape(-1, self.bucket_size)
+        index_list = [starts[:len(buckets)] + np.argmin(buckets, axis=1), starts[:len(buckets)] + np.argmax(buckets, axis=1)]
+
+        # Get the extreme values of the incomplete bucket and return
+        if num_complete < len(data):
+            index_list += [[num_complete + np.argmin(y_values[num_complete:]), num_complete + np.argmax(y_values[num_complete:])]]
+        return np.unique(np.concatenate(index_list))
+
+    def keep(self, data:np.ndarray, indexes:np.ndarray) -> np.ndarray:
+        """
+        Keeps rows, including the very first row
+
+        Parameters:
+        * `data`:    The rows, whose first row is at `self.offset`
+        * `indexes`: The indexes of the rows to keep
+
+        Returns the kept rows
+        """
+        if self.offset == 0 and len(data) > 0 and (len(indexes) == 0 or indexes[0] != 0):
+            indexes = np.concatenate([[0], indexes]).astype(int)
+        if len(indexes) > 0:
+            self.last_kept = self.offset + indexes[-1]
+        return data[indexes]
+
+    def add(self, data:np.ndarray) -> np.ndarray:
+        """
+        Adds a chunk of rows
+
+        Parameters:
+        * `data`: The rows, as an (N,K) array
+
+        Returns the downsampled rows from the completed buckets
+        """
+        data = np.asarray(data)
+        if len(data) == 0:
+            return data
+        data = data if self.remainder is None else np.concatenate([self.remainder, data])
+        num_complete = (len(data) // self.bucket_size) * self.bucket_size
+        kept = self.keep(data[:num_complete], self.get_indexes(data[:num_complete]))
+        self.remainder = data[num_complete:]
+        self.offset += num_complete
+        self.last_row = data[-1:]
+        return kept
+
+    def finish(self) -> np.ndarray:
+        """
+        Flushes the incomplete bucket, including the last row, and resets the downsampler
+
+        Returns the remaining downsampled rows
+        """
+        if self.last_row is None:
+            return np.zeros((0, 0))
+        kept = self.keep(self.remainder, self.get_indexes(self.remainder))
+        if self.last_kept != self.offset + len(self.remainder) - 1:
+            kept = np.concatenate([kept, self.last_row])
+        self.reset()
+        return kept
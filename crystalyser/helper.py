@@ -6,8 +6,9 @@
 """
 
 # Libraries
+import numpy as np
 import pandas as pd
-import math
+import math, os, json
 
 def get_closest(x_list:list, y_list:list, x_value:float) -> float:
     """
@@ -48,6 +49,58 @@ def quick_spline(x_list:list, y_list:list, x_value:float) -> float:
             return y_value
     return None
 
+def get_closest_array(x_list:list, y_list:list, x_values:list) -> tuple:
+    """
+    Finds the closest corresponding y values given many x values using a binary
+    search; vectorised version of `get_closest`, and does not interpolate
+
+    Parameters:
+    * `x_list`:   The list of x values
+    * `y_list`:   The list of y values
+    * `x_values`: The x values to get the closest values of
+
+    Returns the array of closest values and the array of their indexes
+    """
+
+    # Sort the x values (keeping the order of equal values)
+    x_array, y_array = np.asarray(x_list, dtype=float), np.asarray(y_list)
+    x_values = np.atleast_1d(np.asarray(x_values, dtype=float))
+    order = np.argsort(x_array, kind="stable")
+    x_sorted = x_array[order]
+
+    # Get the first of the equal values on either side of each x value
+    right = np.minimum(np.searchsorted(x_sorted, x_values, side="left"), len(x_sorted)-1)
+    left = np.searchsorted(x_sorted, x_sorted[np.maximum(right-1, 0)], side="left")
+    right_diff = np.abs(x_sorted[right] - x_values)
+    left_diff = np.abs(x_sorted[left] - x_values)
+
+    # Choose the closer side, or the earlier index if equally close
+    use_left = (left_diff < right_diff) | ((left_diff == right_diff) & (order[left] < order[right]))
+    indexes = order[np.where(use_left, left, right)]
+    return y_array[indexes], indexes
+
+def quick_spline_array(x_list:list, y_list:list, x_values:list) -> np.ndarray:
+    """
+    Conducts quick evaluations using linear interpolation for many x values,
+    using a binary search for the intervals; vectorised version of `quick_spline`
+    that assumes that x_list is sorted
+
+    Parameters:
+    * `x_list`:   The list of x values
+    * `y_list`:   The list of y values
+    * `x_values`: The x values to evaluate
+
+    Returns the array of evaluated y values (nan for x values outside the x range)
+    """
+    if len(x_list) != len(y_list):
+        raise ValueError("Length of lists do not match!")
+    x_array, y_array = np.asarray(x_list, dtype=float), np.asarray(y_list, dtype=float)
+    x_values = np.atleast_1d(np.asarray(x_values, dtype=float))
+    indexes = np.clip(np.searchsorted(x_array, x_values, side="left") - 1, 0, len(x_array)-2)
+    gradients = (y_array[indexes+1]-y_array[indexes])/(x_array[indexes+1]-x_array[indexes])
+    y_values = gradients*(x_values - x_array[indexes]) + y_array[indexes]
+    return np.where((x_values >= x_array[0]) & (x_values <= x_array[-1]), y_values, np.nan)
+
 def get_thinned_list(unthinned_list:list, density:int) -> list:
     """
     Gets a thinned list
@@ -109,6 +162,47 @@ def csv_to_dict(csv_path:str, delimeter:str=",") -> dict:
     # Return
     return csv_dict
 
+def read_csv_columns(csv_path:str, columns:list=None, delimeter:str=",", collapse:bool=False) -> dict:
+    """
+    Reads a CSV file into a dictionary of typed numpy columns; faster
+    alternative to `csv_to_dict` for large files
+
+    Parameters:
+    * `csv_path`:  The path to the CSV file
+    * `columns`:   The list of headers of the columns to read; reads all columns if unspecified
+    * `delimeter`: The separating character
+    * `collapse`:  Whether to convert single-value columns into single values,
+                   like `csv_to_dict`
+
+    Returns the dictionary of columns; empty cells are removed from each column
+    """
+    data_frame = pd.read_csv(csv_path, sep=delimeter, usecols=columns, encoding="utf-8-sig", float_precision="round_trip")
+    column_dict = {}
+    for header in (data_frame.columns if columns == None else columns):
+        column = data_frame[header].dropna().to_numpy()
+        column_dict[header] = column[0] if collapse and len(column) == 1 else column
+    return column_dict
+
+def iterate_csv_columns(csv_path:str, chunk_size:int, columns:list=None, delimeter:str=","):
+    """
+    Iterates through a CSV file in chunks of rows, for files that do not fit in memory
+
+    Parameters:
+    * `csv_path`:   The path to the CSV file
+    * `chunk_size`: The number of rows per chunk
+    * `columns`:    The list of headers of the columns to read; reads all columns if unspecified
+    * `delimeter`:  The separating character
+
+    Yields a dictionary of typed numpy columns for each chunk; empty cells
+    are kept as nan so that the rows of the columns remain aligned, and
+    numeric columns are always float64, because the types are inferred for
+    each chunk separately (e.g., a column can be integers in one chunk only)
+    """
+    to_column = lambda values : values.astype(np.float64) if np.issubdtype(values.dtype, np.number) else values
+    with pd.read_csv(csv_path, sep=delimeter, usecols=columns, encoding="utf-8-sig", chunksize=chunk_size, float_precision="round_trip") as reader:
+        for data_frame in reader:
+            yield {header: to_column(data_frame[header].to_numpy()) for header in (data_frame.columns if columns == None else columns)}
+
 def dict_to_csv(data_dict:dict, csv_path:str, add_header:bool=True) -> None:
     """
     Converts a dictionary to a CSV file
@@ -119,11 +213,9 @@ def dict_to_csv(data_dict:dict, csv_path:str, add_header:bool=True) -> None:
     * `header`:    Whether to include the header or not
     """
     
-    # Extract headers and turn all values into lists
+    # Extract headers and turn all values into lists (without changing the original dictionary)
     headers = data_dict.keys()
-    for header in headers:
-        if not isinstance(data_dict[header], list):
-            data_dict[header] = [data_dict[header]]
+    data_dict = {header: data_dict[header] if isinstance(data_dict[header], list) else [data_dict[header]] for header in headers}
     
     # Open CSV file and write headers
     csv_fh = open(csv_path, "w+")
@@ -138,6 +230,80 @@ def dict_to_csv(data_dict:dict, csv_path:str, add_header:bool=True) -> None:
         csv_fh.write(row_str + "\n")
     csv_fh.close()
 
+def write_csv_columns(data_dict:dict, csv_path:str, add_header:bool=True, float_format:str="%.17g", chunk_size:int=100000) -> None:
+    """
+    Writes a dictionary of columns to a CSV file; faster alternative to `dict_to_csv`
+    that formats whole blocks of rows at once, accepts numpy arrays, and does not
+    change the dictionary
+
+    Parameters:
+    * `data_dict`:    The dictionary of columns (lists, arrays, or single values)
+    * `csv_path`:     The path that the CSV file will be written to
+    * `add_header`:   Whether to include the header or not
+    * `float_format`: The format of the floating point values; the default is lossless,
+                      and fewer digits (e.g., "%.10g") give smaller files
+    * `chunk_size`:   The number of rows to format at once
+    """
+
+    # Convert columns into arrays and determine their formats
+    columns = [np.atleast_1d(np.asarray(values)) for values in data_dict.values()]
+    formats = [float_format if np.issubdtype(column.dtype, np.floating) else
+               "%d" if np.issubdtype(column.dtype, np.integer) else "%s" for column in columns]
+    lengths = np.array([len(column) for column in columns])
+
+    # Write the rows in blocks where the same columns have values
+    with open(csv_path, "w+") as csv_fh:
+        if add_header:
+            csv_fh.write(",".join(data_dict.keys()) + "\n")
+        boundaries = np.unique(np.concatenate([[0], lengths]))
+        for lower, upper in zip(boundaries[:-1], boundaries[1:]):
+            active = np.flatnonzero(lengths >= upper)
+            row_format = ",".join([formats[i] if i in active else "" for i in range(len(columns))]) + "\n"
+            for start in range(lower, upper, chunk_size):
+                end = min(start + chunk_size, upper)
+                block = np.empty((end - start, len(active)), dtype=object)
+                for j, i in enumerate(active):
+                    block[:,j] = columns[i][start:end].tolist()
+                csv_fh.write((row_format * (end - start)) % tuple(block.ravel()))
+
+def save_columns(data_dict:dict, directory_path:str) -> None:
+    """
+    Saves a dictionary of columns into a directory of binary files, with
+    one memory-mappable .npy file per column and a small metadata file
+
+    Parameters:
+    * `data_dict`:      The dictionary of columns (lists, arrays, or single values)
+    * `directory_path`: The path to the directory
+    """
+    os.makedirs(directory_path, exist_ok=True)
+    metadata = {"headers": [], "files": [], "scalars": []}
+    for i, (header, values) in enumerate(data_dict.items()):
+        file_name = f"column_{i}.npy"
+        np.save(os.path.join(directory_path, file_name), np.atleast_1d(np.asarray(values)), allow_pickle=False)
+        metadata["headers"].append(header)
+        metadata["files"].append(file_name)
+        metadata["scalars"].append(not isinstance(values, (list, tuple, np.ndarray)))
+    with open(os.path.join(directory_path, "metadata.json"), "w") as metadata_fh:
+        json.dump(metadata, metadata_fh, indent=2)
+
+def load_columns(directory_path:str, mmap:bool=True) -> dict:
+    """
+    Loads a dictionary of columns saved by `save_columns` without parsing
+
+    Parameters:
+    * `directory_path`: The path to the directory
+    * `mmap`:           Whether to memory-map the columns rather than reading them
+
+    Returns the dictionary of columns
+    """
+    with open(os.path.join(directory_path, "metadata.json"), "r") as metadata_fh:
+        metadata = json.load(metadata_fh)
+    data_dict = {}
+    for header, file_name, is_scalar in zip(metadata["headers"], metadata["files"], metadata["scalars"]):
+        values = np.load(os.path.join(directory_path, file_name), mmap_mode="r" if mmap else None, allow_pickle=False)
+        data_dict[header] = values[0].item() if is_scalar else values
+    return data_dict
+
 def round_sf(value:float, sf:int) -> float:
     """
     Rounds a float to a number of significant figures
@@ -154,18 +320,134 @@ def round_sf(value:float, sf:int) -> float:
     rounded_value = float(format_str.format(value))
     return rounded_value
 
-def read_excel(excel_path:str, sheet:str, column:int) -> list:
+# Cache of parsed excel sheets, keyed by path, sheet, and modification time
+EXCEL_CACHE = {}
+
+def write_sheet_sidecar(data_frame:pd.DataFrame, sidecar_path:str, modified_time:float) -> None:
+    """
+    Writes a parsed excel sheet into a .npz file without pickling, so that reading
+    the file cannot run code; columns of python objects (e.g., text) are stored as
+    JSON, and sheets that cannot be stored this way (e.g., with dates in text
+    columns) are not written
+
+    Parameters:
+    * `data_frame`:    The data frame of the sheet
+    * `sidecar_path`:  The path to the .npz file
+    * `modified_time`: The modification time of the excel file
+    """
+    try:
+        arrays, is_json_list = {}, []
+        for i, header in enumerate(data_frame.columns):
+            values = data_frame[header].to_numpy()
+            is_json_list.append(values.dtype == object)
+            arrays[f"column_{i}"] = np.array(json.dumps(values.tolist())) if is_json_list[-1] else values
+        metadata = {
+            "mtime":   modified_time,
+            "headers": data_frame.columns.tolist(),
+            "dtypes":  [str(dtype) for dtype in data_frame.dtypes],
+            "is_json": is_json_list,
+        }
+        metadata = np.array(json.dumps(metadata))
+    except TypeError:
+        return
+    np.savez(sidecar_path, metadata=metadata, **arrays)
+
+def get_sidecar_time(sidecar_path:str) -> float:
+    """
+    Gets the modification time of the excel file that a sidecar file was written from,
+    without reading the columns
+
+    Parameters:
+    * `sidecar_path`: The path to the .npz file
+
+    Returns the modification time, or None if the file is missing or unreadable
+    """
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with np.load(sidecar_path, allow_pickle=False) as data:
+            return json.loads(str(data["metadata"]))["mtime"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def read_sheet_sidecar(sidecar_path:str, modified_time:float) -> pd.DataFrame:
+    """
+    Reads a parsed excel sheet written by `write_sheet_sidecar`
+
+    Parameters:
+    * `sidecar_path`:  The path to the .npz file
+    * `modified_time`: The modification time of the excel file
+
+    Returns the data frame of the sheet, or None if the file is missing,
+    unreadable, or older than the excel file
+    """
+    if get_sidecar_time(sidecar_path) != modified_time:
+        return None
+    try:
+        with np.load(sidecar_path, allow_pickle=False) as data:
+            metadata = json.loads(str(data["metadata"]))
+            series_list = []
+            for i, (dtype, is_json) in enumerate(zip(metadata["dtypes"], metadata["is_json"])):
+                values = data[f"column_{i}"]
+                series = pd.Series(json.loads(str(values)), dtype=object) if is_json else pd.Series(values)
+                series_list.append(series if dtype == "object" else series.astype(dtype))
+    except (OSError, ValueError, KeyError):
+        return None
+    data_frame = pd.concat(series_list, axis=1) if series_list != [] else pd.DataFrame()
+    data_frame.columns = metadata["headers"]
+    return data_frame
+
+def read_excel_sheet(excel_path:str, sheet:str, sidecar:bool=False) -> pd.DataFrame:
+    """
+    Reads a sheet of an excel file, parsing it only once per modification of the file
+
+    Parameters:
+    * `excel_path`: The path to the excel file
+    * `sheet`:      The name of the sheet to read from
+    * `sidecar`:    Whether to store the parsed sheet in a .npz file next to the
+                    excel file, so that later runs can skip parsing the excel file
+
+    Returns a copy of the data frame of the sheet
+    """
+
+    # Check the cache in memory and then the sidecar file
+    modified_time = os.path.getmtime(excel_path)
+    cache_key = (os.path.abspath(excel_path), sheet, modified_time)
+    sidecar_path = f"{excel_path}.{sheet}.npz"
+    data_frame = EXCEL_CACHE.get(cache_key)
+    is_stored = False
+    if data_frame is None and sidecar:
+        data_frame = read_sheet_sidecar(sidecar_path, modified_time)
+        is_stored = data_frame is not None
+
+    # Otherwise, parse the excel file
+    if data_frame is None:
+        data_frame = pd.read_excel(excel_path, sheet_name=sheet)
+
+    # Write the sidecar file if requested and missing (e.g., when served from memory)
+    if sidecar and not is_stored and get_sidecar_time(sidecar_path) != modified_time:
+        write_sheet_sidecar(data_frame, sidecar_path, modified_time)
+
+    # Cache (replacing outdated versions of the sheet) and return
+    for outdated_key in [key for key in EXCEL_CACHE if key[:2] == cache_key[:2] and key != cache_key]:
+        del EXCEL_CACHE[outdated_key]
+    EXCEL_CACHE[cache_key] = data_frame
+    return data_frame.copy()
+
+def read_excel(excel_path:str, sheet:str, column:int, sidecar:bool=False) -> list:
     """
-    Reads an excel file
+    Reads an excel file; the sheet is only parsed once and later calls
+    are served from memory
 
     Parameters:
     * `excel_path`: The path to the excel file
     * `sheet`:      The name of the sheet to read from
     * `column`:     The column index
+    * `sidecar`:    Whether to store the parsed sheet in a binary file next to the excel file
 
     Returns a list of values corresponding to that column
     """
-    data_frame = pd.read_excel(excel_path, sheet_name=sheet)
+    data_frame = read_excel_sheet(excel_path, sheet, sidecar)
     data_list = list(data_frame.iloc[:,column])
     # data_list = list(filter(lambda x: not math.isnan(x), data_list))
     # data_list = [round_sf(data, 8) for data in data_list]
@@ -7,8 +7,9 @@
 
 # Libraries
 import numpy as np
-from scipy.interpolate import splev, splrep, splder
+from scipy.interpolate import splev, splrep, splder, make_interp_spline, make_lsq_spline
 from crystalyser.helper import get_thinned_list
+from crystalyser.downsampler import get_uniform_indexes
 
 # The Interpolator Class
 class Interpolator:
@@ -30,12 +31,72 @@ class Interpolator:
             y_list = get_thinned_list(list(y_list), resolution)
         smooth_amount = resolution if smooth else 0
         self.spl = splrep(x_list, y_list, s=smooth_amount)
+        self.derivatives = {}
+
+    @classmethod
+    def from_spline(cls, spl:tuple):
+        """
+        Creates an interpolator from fitted spline coefficients without refitting
+
+        Parameters:
+        * `spl`: The tuple of the knots, coefficients, and degree of the spline
+
+        Returns the interpolator
+        """
+        interpolator = cls.__new__(cls)
+        interpolator.spl = spl
+        interpolator.derivatives = {}
+        return interpolator
+
+    @classmethod
+    def load(cls, file_path:str):
+        """
+        Loads an interpolator from fitted spline coefficients saved by `save`
+
+        Parameters:
+        * `file_path`: The path to the .npz file; the .npz extension is added if missing
+
+        Returns the interpolator
+        """
+        file_path = file_path if file_path.endswith(".npz") else f"{file_path}.npz"
+        with np.load(file_path) as data:
+            spl = (data["knots"], data["coefficients"], int(data["degree"]))
+        return cls.from_spline(spl)
+
+    def save(self, file_path:str) -> None:
+        """
+        Saves the fitted spline coefficients, so that the fit can be reused
+        without re-reading and re-thinning the source data
+
+        Parameters:
+        * `file_path`: The path to the .npz file; the .npz extension is added if missing
+        """
+        file_path = file_path if file_path.endswith(".npz") else f"{file_path}.npz"
+        knots, coefficients, degree = self.spl
+        np.savez(file_path, knots=knots, coefficients=coefficients, degree=degree)
     
     def differentiate(self) -> None:
         """
         Differentiate the interpolator
         """
         self.spl = splder(self.spl)
+        self.derivatives = {}
+
+    def get_derivative(self, order:int=1):
+        """
+        Gets the derivative of the interpolator without changing it;
+        the derivative of each order is cached after the first request
+
+        Parameters:
+        * `order`: The order of the derivative
+
+        Returns the interpolator of the derivative
+        """
+        if order == 0:
+            return self
+        if not order in self.derivatives:
+            self.derivatives[order] = Interpolator.from_spline(splder(self.spl, order))
+        return self.derivatives[order]
 
     def evaluate(self, x_list:list) -> list:
         """
@@ -47,3 +108,46 @@ class Interpolator:
         Returns the evaluated values
         """
         return list(splev(x_list, self.spl))
+
+# The MultiInterpolator Class
+class MultiInterpolator:
+
+    def __init__(self, x_list:list, y_array:np.ndarray, resolution:int=50, smooth:bool=False):
+        """
+        Class for interpolating many series of values that share the same x values,
+        by fitting all the series in one pass
+
+        Parameters:
+        * `x_list`:     List of x values
+        * `y_array`:    Array of y values, with one column per series
+        * `resolution`: The resolution used for the interpolation
+        * `smooth`:     Whether to smooth the interpolation; the knots are
+                        determined by smoothing the mean of the series
+        """
+
+        # Remove duplicates and thin the values
+        x_array, indices = np.unique(np.array(x_list), return_index=True)
+        y_array = np.asarray(y_array, dtype=float)
+        y_array = y_array.reshape(len(y_array), -1)[indices]
+        if len(x_array) > resolution:
+            thin_indexes = get_uniform_indexes(len(x_array), resolution)
+            x_array, y_array = x_array[thin_indexes], y_array[thin_indexes]
+
+        # Fit all the series
+        degree = min(3, len(x_array) - 1)
+        if smooth:
+            knots = splrep(x_array, y_array.mean(axis=1), k=degree, s=resolution)[0]
+            self.spline = make_lsq_spline(x_array, y_array, knots, k=degree, axis=0)
+        else:
+            self.spline = make_interp_spline(x_array, y_array, k=degree, axis=0)
+
+    def evaluate(self, x_list:list) -> np.ndarray:
+        """
+        Run the interpolator for specific values
+
+        Parameters
+        * `x_list`: The list of x values
+
+        Returns the evaluated values as an array, with one column per series
+        """
+        return self.spline(np.asarray(x_list, dtype=float))
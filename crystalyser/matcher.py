@@ -0,0 +1,133 @@
+"""
+ Title:         Matcher
+ Description:   For matching grains between EBSD maps of different deformation steps
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from crystalyser.csl import get_symmetry_quats
+from crystalyser.orientation import get_quat_products
+from crystalyser.orientations import to_quats
+
+# Cost assigned to pairs of grains that are not candidates
+NO_MATCH_COST = 1e9
+
+def get_candidates(eulers_1:np.ndarray, eulers_2:np.ndarray, type:str, max_angle:float, num_neighbours:int) -> tuple:
+    """
+    Finds the candidate matches for each grain of the first map by searching a nearest
+    neighbour index of the symmetric variants of the grains of the second map
+
+    Parameters:
+    * `eulers_1`:       The euler angles of the grains of the first map, as an (N,3) array (rads)
+    * `eulers_2`:       The euler angles of the grains of the second map, as an (M,3) array (rads)
+    * `type`:           The crystal structure type
+    * `max_angle`:      The maximum disorientation of the candidates (rads)
+    * `num_neighbours`: The maximum number of candidates per grain
+
+    Returns the indexes of the grains of the first map, the indexes of the
+    grains of the second map, and their disorientations (rads)
+    """
+
+    # Build an index of the symmetric variants (including q and -q) of the second map
+    quats_1 = to_quats(eulers_1).reshape(-1, 4)
+    quats_2 = to_quats(eulers_2).reshape(-1, 4)
+    if len(quats_1) == 0 or len(quats_2) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    symmetries = get_symmetry_quats(type)
+    variants = get_quat_products(symmetries[None,:,:], quats_2[:,None,:])
+    variants = np.concatenate([variants, -variants], axis=1).reshape(-1, 4)
+    owners = np.repeat(np.arange(len(quats_2)), 2*len(symmetries))
+    tree = cKDTree(variants)
+
+    # Find nearby variants; the chord between unit quaternions is 2*sin(angle/4)
+    max_distance = 2 * np.sin(max_angle / 4)
+    distances, indexes = tree.query(quats_1, k=num_neighbours, distance_upper_bound=max_distance + 1e-12)
+    distances, indexes = distances.reshape(len(quats_1), -1), indexes.reshape(len(quats_1), -1)
+    is_found = np.isfinite(distances)
+    rows = np.repeat(np.arange(len(quats_1)), distances.shape[1])[is_found.flatten()]
+    columns = owners[indexes[is_found]]
+    angles = 4 * np.arcsin(np.clip(distances[is_found] / 2, 0, 1))
+
+    # Keep the closest variant of each pair of grains
+    order = np.lexsort((angles, columns, rows))
+    rows, columns, angles = rows[order], columns[order], angles[order]
+    is_first = np.ones(len(rows), dtype=bool)
+    is_first[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+    return rows[is_first], columns[is_first], angles[is_first]
+
+def match_grains(eulers_1:np.ndarray, eulers_2:np.ndarray, type:str="cubic", weights_1:np.ndarray=None,
+                 weights_2:np.ndarray=None, centroids_1:np.ndarray=None, centroids_2:np.ndarray=None,
+                 max_angle:float=np.pi/12, max_distance:float=None, weight_factor:float=1.0,
+                 distance_factor:float=1.0, num_neighbours:int=16) -> tuple:
+    """
+    Matches the grains of two EBSD maps by their orientations (and optionally their
+    sizes and positions), by solving the assignment problem over the candidate matches
+
+    Parameters:
+    * `eulers_1`:        The euler angles of the grains of the first map, as an (N,3) array (rads), or the orientations
+    * `eulers_2`:        The euler angles of the grains of the second map, as an (M,3) array (rads), or the orientations
+    * `type`:            The crystal structure type
+    * `weights_1`:       The optional weights (e.g., sizes) of the grains of the first map
+    * `weights_2`:       The optional weights (e.g., sizes) of the grains of the second map
+    * `centroids_1`:     The optional centroids of the grains of the first map, as an (N,D) array
+    * `centroids_2`:     The optional centroids of the grains of the second map, as an (M,D) array
+    * `max_angle`:       The maximum disorientation between matched grains (rads)
+    * `max_distance`:    The maximum distance between the centroids of matched grains;
+                         unbounded if unspecified, in which case the median distance
+                         between the centroids of the candidates is used for the costs
+    * `weight_factor`:   The cost of a relative weight difference of 1, relative to a
+                         disorientation of `max_angle`
+    * `distance_factor`: The cost of a centroid distance of `max_distance`, relative to
+                         a disorientation of `max_angle`
+    * `num_neighbours`:  The maximum number of candidates per grain
+
+    Returns the indexes of the matched grains of the first map, the indexes of the
+    matched grains of the second map, and their disorientations (rads)
+    """
+
+    # Get candidates and their costs
+    rows, columns, angles = get_candidates(eulers_1, eulers_2, type, max_angle, num_neighbours)
+    costs = angles / max_angle
+    if weights_1 is not None and weights_2 is not None:
+        weights_1, weights_2 = np.asarray(weights_1, dtype=float), np.asarray(weights_2, dtype=float)
+        weight_sums = np.maximum(weights_1[rows] + weights_2[columns], np.finfo(float).tiny)
+        costs += weight_factor * np.abs(weights_1[rows] - weights_2[columns]) / weight_sums
+    if centroids_1 is not None and centroids_2 is not None:
+        distances = np.linalg.norm(np.asarray(centroids_1)[rows] - np.asarray(centroids_2)[columns], axis=1)
+        if max_distance != None:
+            is_near = distances <= max_distance
+            rows, columns, angles, costs, distances = rows[is_near], columns[is_near], angles[is_near], costs[is_near], distances[is_near]
+        distance_scale = max_distance if max_distance != None else np.median(distances) if len(distances) > 0 else 0
+        costs += distance_factor * distances / (distance_scale if distance_scale > 0 else 1)
+
+    # Split the candidates into independent groups of grains
+    num_grains_1, num_grains_2 = len(eulers_1), len(eulers_2)
+    graph = coo_matrix((np.ones(len(rows)), (rows, num_grains_1 + columns)), shape=(num_grains_1 + num_grains_2,)*2)
+    _, components = connected_components(graph, directed=False)
+    order = np.argsort(components[rows], kind="stable")
+    group_starts = np.flatnonzero(np.diff(components[rows][order], prepend=-1))
+    group_ends = np.append(group_starts[1:], len(order))
+
+    # Solve the assignment problem of each group
+    matched_list = []
+    for start, end in zip(group_starts, group_ends):
+        group = order[start:end]
+        group_rows, row_indexes = np.unique(rows[group], return_inverse=True)
+        group_columns, column_indexes = np.unique(columns[group], return_inverse=True)
+        cost_matrix = np.full((len(group_rows), len(group_columns)), NO_MATCH_COST)
+        cost_matrix[row_indexes, column_indexes] = costs[group]
+        candidate_matrix = np.full(cost_matrix.shape, -1)
+        candidate_matrix[row_indexes, column_indexes] = group
+        assigned_rows, assigned_columns = linear_sum_assignment(cost_matrix)
+        matched = candidate_matrix[assigned_rows, assigned_columns]
+        matched_list.append(matched[matched >= 0])
+
+    # Return the matches
+    matched = np.sort(np.concatenate(matched_list)) if matched_list else np.array([], dtype=int)
+    return rows[matched], columns[matched], angles[matched]
@@ -0,0 +1,203 @@
+"""
+ Title:         Misorientation Distribution Function (MDF)
+ Description:   For accumulating the distributions of disorientations in a streaming fashion
+ References:    https://doi.org/10.1093/biomet/45.1-2.229
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from crystalyser.csl import get_symmetry_quats, get_disorientations, get_quat_disorientations, check_symmetry_type
+
+# Angular extents of the standard triangle for the axis distribution (rads)
+SECTOR_AZIMUTHS = {
+    "cubic":       np.pi/4,
+    "hexagonal":   np.pi/6,
+    "tetrahedral": np.pi/4,
+}
+
+# Smallest polar angle of the axes in the standard triangle of each crystal structure
+# (i.e., the polar angle of [111] for cubic)
+SECTOR_POLARS = {
+    "cubic":       np.arccos(1/np.sqrt(3)),
+    "hexagonal":   0,
+    "tetrahedral": 0,
+}
+
+def get_sphere_points(num_points:int) -> np.ndarray:
+    """
+    Generates points that are (approximately) evenly spaced on a unit sphere
+
+    Parameters:
+    * `num_points`: The number of points
+
+    Returns the points as an (N,3) array
+    """
+    indexes = np.arange(num_points) + 0.5
+    polar = np.arccos(1 - 2 * indexes / num_points)
+    azimuth = np.pi * (1 + 5**0.5) * indexes
+    return np.stack([np.cos(azimuth)*np.sin(polar), np.sin(azimuth)*np.sin(polar), np.cos(polar)], axis=1)
+
+def get_max_angles(axes:np.ndarray, type:str) -> np.ndarray:
+    """
+    Determines the largest disorientation angle about each axis; because the
+    fundamental zone is convex and contains the identity, the rotations about
+    an axis are disorientations up to this angle
+
+    Parameters:
+    * `axes`: The unit axes, as an (N,3) array
+    * `type`: The crystal structure type
+
+    Returns the largest disorientation angles as an (N,) array (rads)
+    """
+
+    # A rotation is a disorientation if |tan(angle/2) * (axis . v_s) + w_s| <= 1 for all operators s
+    symmetries = get_symmetry_quats(type)
+    projections = axes @ symmetries[:,:3].T
+    bounds = np.where(projections > 0, 1 - symmetries[:,3], 1 + symmetries[:,3])
+    is_bounding = np.abs(projections) > 1e-12
+    max_tangents = np.divide(bounds, np.abs(projections), out=np.full(projections.shape, np.inf), where=is_bounding)
+    return 2 * np.arctan(max_tangents.min(axis=1))
+
+def get_mackenzie(type:str, bin_edges:np.ndarray, num_axes:int=200000) -> np.ndarray:
+    """
+    Determines the disorientation angle distribution of randomly oriented
+    crystals (i.e., the mackenzie distribution); the density of uniformly random
+    rotations is integrated exactly over the angles of each bin, up to the
+    largest disorientation angle of each axis, and then averaged over the axes
+
+    Parameters:
+    * `type`:      The crystal structure type
+    * `bin_edges`: The edges of the angle bins (rads)
+    * `num_axes`:  The number of axes to integrate over
+
+    Returns the probability of each bin
+    """
+    check_symmetry_type(type)
+    max_angles = np.sort(get_max_angles(get_sphere_points(num_axes), type))
+
+    # Integrate (1 - cos) up to each bin edge, or up to the largest angle of the axis if smaller
+    bin_edges = np.asarray(bin_edges, dtype=float)
+    get_integral = lambda angles : angles - np.sin(angles)
+    num_below = np.searchsorted(max_angles, bin_edges)
+    cumulative = np.concatenate([[0], np.cumsum(get_integral(max_angles))])
+    integrals = (cumulative[num_below] + (num_axes - num_below) * get_integral(bin_edges)) / num_axes
+
+    # Determine the probability of each bin and return
+    probabilities = len(get_symmetry_quats(type)) / np.pi * np.diff(integrals)
+    return probabilities / probabilities.sum()
+
+# The MDFAccumulator Class
+class MDFAccumulator:
+
+    def __init__(self, type:str="cubic", num_bins:int=180, max_angle:float=np.pi, num_axis_bins:int=None):
+        """
+        Class for accumulating the misorientation distribution of orientation pairs
+        in chunks; the memory usage is fixed by the number of bins
+
+        Parameters:
+        * `type`:          The crystal structure type
+        * `num_bins`:      The number of angle bins
+        * `max_angle`:     The upper bound of the angle bins (rads)
+        * `num_axis_bins`: The number of azimuth and polar bins for the axis
+                           distribution, spanning the azimuths and polar angles
+                           of the standard triangle; the axis distribution is
+                           not accumulated if unspecified
+        """
+        check_symmetry_type(type)
+        self.type = type
+        self.bin_edges = np.linspace(0, max_angle, num_bins + 1)
+        self.counts = np.zeros(num_bins, dtype=np.int64)
+        self.num_axis_bins = num_axis_bins
+        if num_axis_bins != None:
+            self.azimuth_edges = np.linspace(0, SECTOR_AZIMUTHS[type], num_axis_bins + 1)
+            self.polar_edges = np.linspace(SECTOR_POLARS[type], np.pi/2, num_axis_bins + 1)
+            self.axis_counts = np.zeros((num_axis_bins, num_axis_bins), dtype=np.int64)
+
+    def add(self, eulers_1:np.ndarray, eulers_2:np.ndarray) -> None:
+        """
+        Adds a chunk of orientation pairs to the distribution
+
+        Parameters:
+        * `eulers_1`: The first euler angles, as an (N,3) array (rads)
+        * `eulers_2`: The second euler angles, as an (N,3) array (rads)
+        """
+        if self.num_axis_bins == None:
+            self.add_disorientations(get_disorientations(eulers_1, eulers_2, self.type))
+        else:
+            self.add_disorientations(*get_quat_disorientations(eulers_1, eulers_2, self.type))
+
+    def add_disorientations(self, angles:np.ndarray, axes:np.ndarray=None) -> None:
+        """
+        Adds a chunk of precomputed disorientations to the distribution
+
+        Parameters:
+        * `angles`: The disorientation angles, as an (N,) array (rads)
+        * `axes`:   The disorientation axes in the standard triangle, as an (N,3) array
+        """
+        self.counts += np.histogram(angles, self.bin_edges)[0]
+        if self.num_axis_bins != None:
+            if axes is None:
+                raise ValueError("The disorientation axes are required for the axis distribution!")
+            azimuths = np.clip(np.arctan2(axes[:,1], axes[:,0]), self.azimuth_edges[0], self.azimuth_edges[-1])
+            polars = np.clip(np.arccos(np.clip(axes[:,2], -1, 1)), self.polar_edges[0], self.polar_edges[-1])
+            self.axis_counts += np.histogram2d(azimuths, polars, [self.azimuth_edges, self.polar_edges])[0].astype(np.int64)
+
+    def consume(self, chunks) -> None:
+        """
+        Adds every chunk from an iterable of orientation pairs
+
+        Parameters:
+        * `chunks`: The iterable of (`eulers_1`, `eulers_2`) tuples
+        """
+        for eulers_1, eulers_2 in chunks:
+            self.add(eulers_1, eulers_2)
+
+    def merge(self, other) -> None:
+        """
+        Merges the distribution of another accumulator (e.g., from a separate worker)
+
+        Parameters:
+        * `other`: The other accumulator
+        """
+        if self.type != other.type or not np.array_equal(self.bin_edges, other.bin_edges) or self.num_axis_bins != other.num_axis_bins:
+            raise ValueError("The accumulators do not have the same bins!")
+        self.counts += other.counts
+        if self.num_axis_bins != None:
+            self.axis_counts += other.axis_counts
+
+    def get_bin_centres(self) -> np.ndarray:
+        """
+        Returns the centres of the angle bins (rads)
+        """
+        return 0.5 * (self.bin_edges[1:] + self.bin_edges[:-1])
+
+    def get_distribution(self) -> np.ndarray:
+        """
+        Returns the probability densities of the angle bins
+        """
+        return self.counts / max(self.counts.sum(), 1) / np.diff(self.bin_edges)
+
+    def get_axis_distribution(self) -> np.ndarray:
+        """
+        Returns the fraction of axes in each (azimuth, polar) bin of the standard triangle
+        """
+        return self.axis_counts / max(self.axis_counts.sum(), 1)
+
+    def get_random_distribution(self) -> np.ndarray:
+        """
+        Returns the probability densities of the angle bins for randomly oriented crystals
+        """
+        return get_mackenzie(self.type, self.bin_edges) / np.diff(self.bin_edges)
+
+    def get_random_ratios(self) -> np.ndarray:
+        """
+        Returns the densities of the angle bins as multiples of random densities;
+        bins that cannot be reached by random orientations are set to nan
+        """
+        random_distribution = self.get_random_distribution()
+        ratios = np.full(len(random_distribution), np.nan)
+        is_reachable = random_distribution > 0
+        ratios[is_reachable] = self.get_distribution()[is_reachable] / random_distribution[is_reachable]
+        return ratios
@@ -0,0 +1,272 @@
+"""
+ Title:         Local Misorientation
+ Description:   For computing kernel average misorientation (KAM) and grain reference
+                orientation deviation (GROD) maps of large EBSD maps in tiles
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from crystalyser.csl import get_quat_angles, check_symmetry_type
+from crystalyser.orientation import eulers_to_quats
+from crystalyser.parallel import create_shared_array
+from crystalyser.reconstruction import get_grain_means
+
+def load_map(source) -> np.ndarray:
+    """
+    Loads a map without reading it into memory
+
+    Parameters:
+    * `source`: The map, or the path to a .npy file of the map
+
+    Returns the (possibly memory-mapped) map
+    """
+    if isinstance(source, str):
+        return np.load(source, mmap_mode="r", allow_pickle=False)
+    return source
+
+def get_kam_rows(eulers:np.ndarray, start:int, end:int, type:str, radius:int=1, threshold:float=np.radians(5)) -> np.ndarray:
+    """
+    Determines the kernel average misorientations of a band of rows, using
+    halo rows above and below the band; each pair of neighbours is only
+    evaluated once
+
+    Parameters:
+    * `eulers`:    The euler angles of the pixels, as an (H,W,3) array (rads); nan for unindexed pixels
+    * `start`:     The first row of the band
+    * `end`:       The row after the last row of the band
+    * `type`:      The crystal structure type
+    * `radius`:    The radius of the square kernel, in pixels
+    * `threshold`: The maximum disorientation of the neighbours to include (rads)
+
+    Returns the kernel average misorientations as an (end-start,W) array (rads);
+    nan for pixels without neighbours below the threshold
+    """
+
+    # Read the band and its halo rows into a padded array of quaternions
+    height, width = eulers.shape[:2]
+    lower, upper = max(start - radius, 0), min(end + radius, height)
+    padded = np.full((end - start + 2*radius, width + 2*radius, 4), np.nan)
+    padded[lower-start+radius:upper-start+radius, radius:radius+width] = eulers_to_quats(eulers[lower:upper])
+    padded_height, padded_width = padded.shape[:2]
+
+    # Accumulate the disorientations of each pair of neighbours to both pixels
+    sums = np.zeros((padded_height, padded_width))
+    counts = np.zeros((padded_height, padded_width))
+    offsets = [(dy, dx) for dy in range(radius+1) for dx in range(-radius, radius+1) if dy > 0 or dx > 0]
+    for dy, dx in offsets:
+        rows_1, rows_2 = slice(0, padded_height-dy), slice(dy, padded_height)
+        columns_1 = slice(max(-dx, 0), padded_width-max(dx, 0))
+        columns_2 = slice(max(dx, 0), padded_width-max(-dx, 0))
+        angles = get_quat_angles(padded[rows_1, columns_1], padded[rows_2, columns_2], type)
+        is_included = angles <= threshold
+        angles = np.where(is_included, angles, 0)
+        for rows, columns in [(rows_1, columns_1), (rows_2, columns_2)]:
+            sums[rows, columns] += angles
+            counts[rows, columns] += is_included
+
+    # Average the disorientations of the band
+    sums = sums[radius:radius+end-start, radius:radius+width]
+    counts = counts[radius:radius+end-start, radius:radius+width]
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+def get_grod_rows(eulers:np.ndarray, grain_ids:np.ndarray, mean_quats:np.ndarray, start:int, end:int, type:str) -> np.ndarray:
+    """
+    Determines the grain reference orientation deviations of a band of rows
+
+    Parameters:
+    * `eulers`:     The euler angles of the pixels, as an (H,W,3) array (rads)
+    * `grain_ids`:  The grain IDs of the pixels, as an (H,W) array; negative IDs are ignored
+    * `mean_quats`: The mean quaternions of the grains, as a (G,4) array
+    * `start`:      The first row of the band
+    * `end`:        The row after the last row of the band
+    * `type`:       The crystal structure type
+
+    Returns the grain reference orientation deviations as an (end-start,W) array (rads);
+    nan for pixels without grains
+    """
+    quats = eulers_to_quats(eulers[start:end])
+    ids = np.asarray(grain_ids[start:end])
+    angles = get_quat_angles(quats, mean_quats[np.maximum(ids, 0)], type)
+    return np.where(ids >= 0, angles, np.nan)
+
+def get_memmap_source(array:np.ndarray) -> tuple:
+    """
+    Describes where a memory-mapped map is stored, so that workers can map
+    the file themselves rather than receiving a copy of the map
+
+    Parameters:
+    * `array`: The map
+
+    Returns the tuple of the path, offset, shape, and type of the map in its file,
+    or None if the map is not a contiguous memory-mapped array
+    """
+    if not isinstance(array, np.memmap) or array.filename == None or not array.flags.c_contiguous:
+        return None
+
+    # Slices of a memory-mapped array keep the offset of the array they were sliced from
+    root = array
+    while isinstance(root.base, np.memmap):
+        root = root.base
+    address = lambda array : array.__array_interface__["data"][0]
+    offset = root.offset + address(array) - address(root)
+    return array.filename, offset, array.shape, array.dtype
+
+def attach_source(source:tuple) -> tuple:
+    """
+    Attaches to an input map in a worker; run by each worker
+
+    Parameters:
+    * `source`: The path to the .npy file of the map, the tuple of the path, offset,
+                shape, and type of the memory-mapped map, or the tuple of the
+                name, shape, and type of the shared memory of the map
+
+    Returns the map and the shared memory (or None)
+    """
+    if isinstance(source, str):
+        return load_map(source), None
+    if len(source) == 4:
+        file_path, offset, shape, dtype = source
+        return np.memmap(file_path, dtype=dtype, mode="r", offset=offset, shape=shape), None
+    name, shape, dtype = source
+    shared_memory = SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf), shared_memory
+
+def run_map_task(task:tuple) -> np.ndarray:
+    """
+    Computes the values of a band of rows of a map; run by each worker
+
+    Parameters:
+    * `task`: The tuple of the function, the sources of the input maps,
+              the other arguments before the row bounds, the row bounds,
+              and the arguments after the row bounds
+
+    Returns the values of the band
+    """
+    function, sources, arguments, start, end, keywords = task
+    attached_list = [attach_source(source) for source in sources]
+    arrays = [array for array, _ in attached_list]
+    values = function(*arrays, *arguments, start, end, **keywords)
+
+    # Detach from the shared memory
+    shared_memories = [shared_memory for _, shared_memory in attached_list if shared_memory != None]
+    del arrays, attached_list
+    for shared_memory in shared_memories:
+        shared_memory.close()
+    return values
+
+def get_map(function, sources:list, arguments:tuple, keywords:dict, shape:tuple, num_rows:int,
+            num_workers:int, output_path:str) -> np.ndarray:
+    """
+    Computes a map in bands of rows, optionally spreading the bands over a pool
+    of processes; the input maps on disk (i.e., paths and contiguous memory-mapped
+    arrays) are memory-mapped by each worker, and the others are passed through
+    shared memory
+
+    Parameters:
+    * `function`:    The function that computes a band of rows
+    * `sources`:     The input maps, which can be memory-mapped, or the paths to their .npy files
+    * `arguments`:   The other arguments of the function before the row bounds
+    * `keywords`:    The arguments of the function after the row bounds
+    * `shape`:       The shape of the map
+    * `num_rows`:    The number of rows per band
+    * `num_workers`: The number of processes; computes in this process if 1,
+                     and uses the number of CPUs if None
+    * `output_path`: The optional path to a .npy file to write the map into,
+                     so that the map is not held in memory
+
+    Returns the (possibly memory-mapped) map
+    """
+
+    # Allocate the output map
+    if output_path == None:
+        values = np.empty(shape)
+    else:
+        values = np.lib.format.open_memmap(output_path, mode="w+", dtype=float, shape=shape)
+    bounds = [(start, min(start + num_rows, shape[0])) for start in range(0, shape[0], num_rows)]
+
+    # Compute the bands in this process
+    if num_workers == 1:
+        arrays = [load_map(source) for source in sources]
+        for start, end in bounds:
+            values[start:end] = function(*arrays, *arguments, start, end, **keywords)
+        return values
+
+    # Otherwise, share the input maps that are not on disk and compute the bands in a pool
+    memmap_list = [None if isinstance(source, str) else get_memmap_source(source) for source in sources]
+    shared_list = [None if isinstance(source, str) or memmap != None else create_shared_array(source.shape, source, source.dtype)
+                   for source, memmap in zip(sources, memmap_list)]
+    try:
+        task_sources = [memmap if memmap != None else source if shared == None else (shared[0].name, source.shape, source.dtype)
+                        for source, memmap, shared in zip(sources, memmap_list, shared_list)]
+        tasks = [(function, task_sources, arguments, start, end, keywords) for start, end in bounds]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for (start, end), band in zip(bounds, executor.map(run_map_task, tasks)):
+                values[start:end] = band
+
+    # Release the shared memory
+    finally:
+        for shared in shared_list:
+            if shared != None:
+                shared[0].close()
+                shared[0].unlink()
+    return values
+
+def get_kam_map(eulers, type:str="cubic", radius:int=1, threshold:float=np.radians(5), chunk_size:int=1000000,
+                num_workers:int=1, output_path:str=None) -> np.ndarray:
+    """
+    Determines the kernel average misorientation (KAM) of each pixel, which is the mean
+    disorientation between the pixel and its neighbours below the threshold
+
+    Parameters:
+    * `eulers`:      The euler angles of the pixels, as an (H,W,3) array (rads) that can be
+                     memory-mapped, or the path to a .npy file of them; nan for unindexed pixels
+    * `type`:        The crystal structure type
+    * `radius`:      The radius of the square kernel, in pixels
+    * `threshold`:   The maximum disorientation of the neighbours to include (rads)
+    * `chunk_size`:  The approximate number of pixels per band of rows
+    * `num_workers`: The number of processes; computes in this process if 1,
+                     and uses the number of CPUs if None
+    * `output_path`: The optional path to a .npy file to write the map into
+
+    Returns the KAM map as an (H,W) array (rads); nan for pixels without neighbours below the threshold
+    """
+    check_symmetry_type(type)
+    height, width = load_map(eulers).shape[:2]
+    num_rows = max(chunk_size // max(width, 1), radius, 1)
+    return get_map(get_kam_rows, [eulers], (), {"type": type, "radius": radius, "threshold": threshold},
+                   (height, width), num_rows, num_workers, output_path)
+
+def get_grod_map(eulers, grain_ids, type:str="cubic", mean_eulers:np.ndarray=None, chunk_size:int=1000000,
+                 num_workers:int=1, output_path:str=None) -> np.ndarray:
+    """
+    Determines the grain reference orientation deviation (GROD) of each pixel,
+    which is the disorientation between the pixel and the mean orientation of its grain
+
+    Parameters:
+    * `eulers`:      The euler angles of the pixels, as an (H,W,3) array (rads) that can be
+                     memory-mapped, or the path to a .npy file of them
+    * `grain_ids`:   The grain IDs of the pixels, as an (H,W) array that can be memory-mapped,
+                     or the path to a .npy file of them; negative IDs are ignored
+    * `type`:        The crystal structure type
+    * `mean_eulers`: The mean euler angles of the grains, as a (G,3) array (rads);
+                     determined from the pixels if unspecified
+    * `chunk_size`:  The approximate number of pixels per band of rows
+    * `num_workers`: The number of processes; computes in this process if 1,
+                     and uses the number of CPUs if None
+    * `output_path`: The optional path to a .npy file to write the map into
+
+    Returns the GROD map as an (H,W) array (rads); nan for pixels without grains
+    """
+    check_symmetry_type(type)
+    eulers_map, ids_map = load_map(eulers), load_map(grain_ids)
+    height, width = eulers_map.shape[:2]
+    if mean_eulers is None:
+        mean_eulers = get_grain_means(eulers_map, ids_map, None, type)
+    mean_quats = eulers_to_quats(mean_eulers)
+    num_rows = max(chunk_size // max(width, 1), 1)
+    return get_map(get_grod_rows, [eulers, grain_ids], (mean_quats,), {"type": type},
+                   (height, width), num_rows, num_workers, output_path)
@@ -85,6 +85,60 @@ def matrix_to_euler(matrix:list) -> list:
     phi_2 = phi_2 + 2*math.pi if phi_2 < 0 else phi_2
     return [phi_1, Phi, phi_2]
 
+def eulers_to_matrices(eulers:np.ndarray) -> np.ndarray:
+    """
+    Determines the orientation matrices of many sets of euler-bunge angles (rads);
+    vectorised version of `euler_to_matrix`
+
+    Parameters:
+    * `eulers`: The euler angles in euler-bunge form, as an (N,3) array
+
+    Returns the orientation matrices as an (N,3,3) array
+    """
+    eulers = np.asarray(eulers, dtype=float)
+    cos_1, cos_P, cos_2 = np.cos(eulers[...,0]), np.cos(eulers[...,1]), np.cos(eulers[...,2])
+    sin_1, sin_P, sin_2 = np.sin(eulers[...,0]), np.sin(eulers[...,1]), np.sin(eulers[...,2])
+    om = np.empty(eulers.shape[:-1] + (3,3))
+    om[...,0,0] = cos_1*cos_2 - sin_1*sin_2*cos_P
+    om[...,0,1] = sin_1*cos_2 + cos_1*sin_2*cos_P
+    om[...,0,2] = sin_2*sin_P
+    om[...,1,0] = -cos_1*sin_2 - sin_1*cos_2*cos_P
+    om[...,1,1] = -sin_1*sin_2 + cos_1*cos_2*cos_P
+    om[...,1,2] = cos_2*sin_P
+    om[...,2,0] = sin_1*sin_P
+    om[...,2,1] = -cos_1*sin_P
+    om[...,2,2] = cos_P
+    return om
+
+def matrices_to_eulers(matrices:np.ndarray) -> np.ndarray:
+    """
+    Determines the euler-bunge angles of many orientation matrices (rads);
+    vectorised version of `matrix_to_euler`
+
+    Parameters:
+    * `matrices`: The orientation matrices, as an (N,3,3) array
+
+    Returns the euler angles as an (N,3) array
+    """
+
+    # Determine the general case
+    matrices = np.asarray(matrices, dtype=float)
+    Phi   = np.arccos(np.clip(matrices[...,2,2], -1, 1))
+    phi_1 = np.arctan2(matrices[...,2,0], -matrices[...,2,1])
+    phi_2 = np.arctan2(matrices[...,0,2], matrices[...,1,2])
+
+    # Handle the special cases where Phi is 0 or pi
+    is_zero = Phi == 0
+    is_pi   = Phi == math.pi
+    phi_1 = np.where(is_zero, np.arctan2(-matrices[...,1,0], matrices[...,0,0]), phi_1)
+    phi_1 = np.where(is_pi, np.arctan2(matrices[...,1,0], matrices[...,0,0]), phi_1)
+    phi_2 = np.where(is_zero | is_pi, 0.0, phi_2)
+
+    # Wrap angles and return
+    phi_1 = np.where(phi_1 < 0, phi_1 + 2*math.pi, phi_1)
+    phi_2 = np.where(phi_2 < 0, phi_2 + 2*math.pi, phi_2)
+    return np.stack([phi_1, Phi, phi_2], axis=-1)
+
 def rad_to_deg(radians:float) -> float:
     """
     Converts radians to degrees
@@ -131,6 +185,56 @@ def random_quat():
     w = math.sqrt(u[0]) * math.cos(2 * math.pi * u[2])
     return [x, y, z, w]
 
+def random_eulers(num_eulers:int, rng:np.random.Generator=None) -> np.ndarray:
+    """
+    Generates many sets of (uniformly) random euler-bunge angles (rads);
+    vectorised version of `random_euler`, but returning radians
+
+    Parameters:
+    * `num_eulers`: The number of euler angles
+    * `rng`:        The random number generator; a new unseeded one if unspecified
+
+    Returns the euler angles as an (N,3) array
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    samples = rng.random((num_eulers, 3))
+    return np.stack([2*np.pi*samples[:,0], np.arccos(2*samples[:,1]-1), 2*np.pi*samples[:,2]], axis=1)
+
+def random_quats(num_quats:int, rng:np.random.Generator=None) -> np.ndarray:
+    """
+    Generates many (uniformly) random unit quaternions;
+    vectorised version of `random_quat`
+
+    Parameters:
+    * `num_quats`: The number of quaternions
+    * `rng`:       The random number generator; a new unseeded one if unspecified
+
+    Returns the quaternions as an (N,4) array of [x, y, z, w] with w >= 0
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    u = rng.random((num_quats, 3))
+    quats = np.stack([
+        np.sqrt(1 - u[:,0]) * np.sin(2 * np.pi * u[:,1]),
+        np.sqrt(1 - u[:,0]) * np.cos(2 * np.pi * u[:,1]),
+        np.sqrt(u[:,0]) * np.sin(2 * np.pi * u[:,2]),
+        np.sqrt(u[:,0]) * np.cos(2 * np.pi * u[:,2]),
+    ], axis=1)
+    return np.where(quats[:,3:] < 0, -quats, quats)
+
+def get_generators(seed:int, num_generators:int) -> list:
+    """
+    Creates independent random number generators from a single seed, such
+    that samples can be split reproducibly across parallel workers
+
+    Parameters:
+    * `seed`:           The seed
+    * `num_generators`: The number of generators (e.g., one per worker)
+
+    Returns the list of random number generators
+    """
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_generators)
+    return [np.random.default_rng(seed_sequence) for seed_sequence in seed_sequences]
+
 def euler_to_quat(phi_1:float, Phi:float, phi_2:float) -> float:
     """
     Converts a set of euler-bunge angles into a quaternion (rads)
@@ -170,3 +274,115 @@ def quat_to_euler(x:float, y:float, z:float, w:float) -> list:
     Phi   = math.asin(max([min([2 * (w * y - z * x), 1]), -1]))
     phi_2 = math.atan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
     return [phi_1, Phi, phi_2]
+
+def eulers_to_quats(eulers:np.ndarray) -> np.ndarray:
+    """
+    Converts many sets of euler-bunge angles into quaternions (rads); unlike
+    `euler_to_quat`, the quaternions are consistent with `euler_to_matrix`,
+    such that `quats_to_matrices(eulers_to_quats(eulers))` gives the
+    orientation matrices
+
+    Parameters:
+    * `eulers`: The euler angles in euler-bunge form, as an (N,3) array
+
+    Returns the quaternions as an (N,4) array of [x, y, z, w] with w >= 0
+    """
+    eulers = np.asarray(eulers, dtype=float)
+    sigma = 0.5 * (eulers[...,0] + eulers[...,2])
+    delta = 0.5 * (eulers[...,0] - eulers[...,2])
+    cos_P, sin_P = np.cos(0.5 * eulers[...,1]), np.sin(0.5 * eulers[...,1])
+    quats = np.stack([
+        -sin_P * np.cos(delta),
+        -sin_P * np.sin(delta),
+        -cos_P * np.sin(sigma),
+        cos_P * np.cos(sigma),
+    ], axis=-1)
+    return np.where(quats[...,3:] < 0, -quats, quats)
+
+def quats_to_matrices(quats:np.ndarray) -> np.ndarray:
+    """
+    Converts many quaternions into orientation matrices
+
+    Parameters:
+    * `quats`: The quaternions, as an (N,4) array of [x, y, z, w]
+
+    Returns the orientation matrices as an (N,3,3) array
+    """
+    quats = np.asarray(quats, dtype=float)
+    x, y, z, w = quats[...,0], quats[...,1], quats[...,2], quats[...,3]
+    om = np.empty(quats.shape[:-1] + (3,3))
+    om[...,0,0] = 1 - 2*(y*y + z*z)
+    om[...,0,1] = 2*(x*y - z*w)
+    om[...,0,2] = 2*(x*z + y*w)
+    om[...,1,0] = 2*(x*y + z*w)
+    om[...,1,1] = 1 - 2*(x*x + z*z)
+    om[...,1,2] = 2*(y*z - x*w)
+    om[...,2,0] = 2*(x*z - y*w)
+    om[...,2,1] = 2*(y*z + x*w)
+    om[...,2,2] = 1 - 2*(x*x + y*y)
+    return om
+
+def matrices_to_quats(matrices:np.ndarray) -> np.ndarray:
+    """
+    Converts many orientation matrices into quaternions; inverse of `quats_to_matrices`
+
+    Parameters:
+    * `matrices`: The orientation matrices, as an (N,3,3) array
+
+    Returns the quaternions as an (N,4) array of [x, y, z, w] with w >= 0
+    """
+
+    # Determine the quaternions from the largest diagonal term for stability
+    om = np.asarray(matrices, dtype=float)
+    diagonals = np.stack([om[...,0,0], om[...,1,1], om[...,2,2]], axis=-1)
+    trace = diagonals.sum(axis=-1)
+    candidates = np.stack([trace, diagonals[...,0], diagonals[...,1], diagonals[...,2]], axis=-1)
+    largest = np.argmax(candidates, axis=-1)
+
+    # Compute all four forms
+    root = 0.5 * np.sqrt(np.maximum(1 + 2*np.take_along_axis(candidates, largest[...,None], -1)[...,0] - trace, 0))
+    quarter = 0.25 / np.maximum(root, np.finfo(float).tiny)
+    forms = np.stack([
+        [(om[...,2,1]-om[...,1,2])*quarter, (om[...,0,2]-om[...,2,0])*quarter, (om[...,1,0]-om[...,0,1])*quarter, root],
+        [root, (om[...,0,1]+om[...,1,0])*quarter, (om[...,0,2]+om[...,2,0])*quarter, (om[...,2,1]-om[...,1,2])*quarter],
+        [(om[...,0,1]+om[...,1,0])*quarter, root, (om[...,1,2]+om[...,2,1])*quarter, (om[...,0,2]-om[...,2,0])*quarter],
+        [(om[...,0,2]+om[...,2,0])*quarter, (om[...,1,2]+om[...,2,1])*quarter, root, (om[...,1,0]-om[...,0,1])*quarter],
+    ])
+
+    # Select the stable form and return
+    quats = np.moveaxis(forms, (0,1), (-2,-1))
+    quats = np.take_along_axis(quats, largest[...,None,None], -2)[...,0,:]
+    quats /= np.linalg.norm(quats, axis=-1, keepdims=True)
+    return np.where(quats[...,3:] < 0, -quats, quats)
+
+def get_quat_products(quats_1:np.ndarray, quats_2:np.ndarray) -> np.ndarray:
+    """
+    Determines the hamilton products of many pairs of quaternions, such
+    that the product corresponds to the matrix product of `quats_1` and `quats_2`
+
+    Parameters:
+    * `quats_1`: The first quaternions, as an (N,4) array of [x, y, z, w]
+    * `quats_2`: The second quaternions, as an (N,4) array of [x, y, z, w]
+
+    Returns the quaternion products as an (N,4) array
+    """
+    quats_1, quats_2 = np.asarray(quats_1, dtype=float), np.asarray(quats_2, dtype=float)
+    x_1, y_1, z_1, w_1 = quats_1[...,0], quats_1[...,1], quats_1[...,2], quats_1[...,3]
+    x_2, y_2, z_2, w_2 = quats_2[...,0], quats_2[...,1], quats_2[...,2], quats_2[...,3]
+    return np.stack([
+        w_1*x_2 + x_1*w_2 + y_1*z_2 - z_1*y_2,
+        w_1*y_2 - x_1*z_2 + y_1*w_2 + z_1*x_2,
+        w_1*z_2 + x_1*y_2 - y_1*x_2 + z_1*w_2,
+        w_1*w_2 - x_1*x_2 - y_1*y_2 - z_1*z_2,
+    ], axis=-1)
+
+def get_quat_conjugates(quats:np.ndarray) -> np.ndarray:
+    """
+    Determines the conjugates (i.e., inverses) of many unit quaternions
+
+    Parameters:
+    * `quats`: The quaternions, as an (N,4) array of [x, y, z, w]
+
+    Returns the conjugated quaternions as an (N,4) array
+    """
+    return np.asarray(quats, dtype=float) * np.array([-1, -1, -1, 1])
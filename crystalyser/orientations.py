@@ -0,0 +1,173 @@
+"""
+ Title:         Orientations
+ Description:   Container for many orientations with lazily cached representations
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from crystalyser.orientation import eulers_to_matrices, matrices_to_eulers, eulers_to_quats, quats_to_matrices
+
+def get_frozen_view(array:np.ndarray) -> np.ndarray:
+    """
+    Gets a read-only view of an array, so that the cached representations
+    cannot go out of date; the array itself is left writeable
+
+    Parameters:
+    * `array`: The array, or None
+
+    Returns the read-only view (or None)
+    """
+    if array is None:
+        return None
+    view = array.view()
+    view.setflags(write=False)
+    return view
+
+# The Orientations Class
+class Orientations:
+
+    def __init__(self, eulers:np.ndarray, degrees:bool=False, dtype:type=np.float64):
+        """
+        Class for storing many orientations in a single contiguous array;
+        the matrix and quaternion representations are computed on demand
+        and cached, so the arrays are read-only
+
+        Parameters:
+        * `eulers`:  The euler-bunge angles, as an (N,3) array; not copied if already
+                     contiguous with the storage type, so should not be modified afterwards
+        * `degrees`: Whether the euler angles are in degrees rather than radians
+        * `dtype`:   The storage type (e.g., np.float32 to halve memory usage)
+        """
+        eulers = np.asarray(eulers)
+        eulers = np.radians(eulers) if degrees else eulers
+        self.eulers = get_frozen_view(np.ascontiguousarray(eulers, dtype=dtype).reshape(-1, 3))
+        self.matrices = None
+        self.quats = None
+
+    @classmethod
+    def from_quats(cls, quats:np.ndarray, dtype:type=np.float64):
+        """
+        Creates the orientations from quaternions
+
+        Parameters:
+        * `quats`: The quaternions, as an (N,4) array of [x, y, z, w]
+        * `dtype`: The storage type
+
+        Returns the orientations
+        """
+        quats = np.asarray(quats, dtype=float).reshape(-1, 4)
+        orientations = cls(matrices_to_eulers(quats_to_matrices(quats)), dtype=dtype)
+        orientations.quats = get_frozen_view(np.ascontiguousarray(quats, dtype=dtype))
+        return orientations
+
+    @classmethod
+    def from_view(cls, eulers:np.ndarray, matrices:np.ndarray=None, quats:np.ndarray=None):
+        """
+        Creates the orientations from existing arrays without copying them
+
+        Parameters:
+        * `eulers`:   The euler angles (rads)
+        * `matrices`: The optional cached matrices
+        * `quats`:    The optional cached quaternions
+
+        Returns the orientations
+        """
+        orientations = cls.__new__(cls)
+        orientations.eulers = get_frozen_view(eulers)
+        orientations.matrices = get_frozen_view(matrices)
+        orientations.quats = get_frozen_view(quats)
+        return orientations
+
+    def __len__(self) -> int:
+        """
+        Returns the number of orientations
+        """
+        return len(self.eulers)
+
+    def __getitem__(self, key):
+        """
+        Gets a subset of the orientations; slices share memory with the
+        original orientations and their cached representations
+
+        Parameters:
+        * `key`: The index, slice, or mask
+
+        Returns the subset of the orientations
+        """
+        key = slice(key, (key + 1) or None) if isinstance(key, (int, np.integer)) else key
+        return Orientations.from_view(
+            eulers   = self.eulers[key],
+            matrices = None if self.matrices is None else self.matrices[key],
+            quats    = None if self.quats is None else self.quats[key],
+        )
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """
+        Returns the euler angles (rads) when converted into an array; the
+        read-only euler angles are only returned without copying if NumPy
+        allows it (i.e., `copy` is not True)
+        """
+        if copy:
+            return np.array(self.eulers, dtype=dtype, copy=True)
+        return self.eulers if dtype is None else self.eulers.astype(dtype, copy=False)
+
+    def get_dtype(self) -> type:
+        """
+        Returns the storage type
+        """
+        return self.eulers.dtype
+
+    def get_eulers(self, degrees:bool=False) -> np.ndarray:
+        """
+        Returns the euler angles as an (N,3) array
+
+        Parameters:
+        * `degrees`: Whether to return the euler angles in degrees rather than radians
+        """
+        return np.degrees(self.eulers) if degrees else self.eulers
+
+    def get_matrices(self) -> np.ndarray:
+        """
+        Returns the orientation matrices as an (N,3,3) array
+        """
+        if self.matrices is None:
+            self.matrices = get_frozen_view(eulers_to_matrices(self.eulers).astype(self.get_dtype(), copy=False))
+        return self.matrices
+
+    def get_quats(self) -> np.ndarray:
+        """
+        Returns the quaternions as an (N,4) array of [x, y, z, w]
+        """
+        if self.quats is None:
+            self.quats = get_frozen_view(eulers_to_quats(self.eulers).astype(self.get_dtype(), copy=False))
+        return self.quats
+
+def to_matrices(orientations) -> np.ndarray:
+    """
+    Gets the orientation matrices of euler angles or orientations,
+    using the cached matrices where possible
+
+    Parameters:
+    * `orientations`: The euler angles, as an (N,3) array (rads), or the orientations
+
+    Returns the orientation matrices as an (N,3,3) array
+    """
+    if isinstance(orientations, Orientations):
+        return orientations.get_matrices()
+    return eulers_to_matrices(orientations)
+
+def to_quats(orientations) -> np.ndarray:
+    """
+    Gets the quaternions of euler angles or orientations,
+    using the cached quaternions where possible
+
+    Parameters:
+    * `orientations`: The euler angles, as an (N,3) array (rads), or the orientations
+
+    Returns the quaternions as an (N,4) array of [x, y, z, w]
+    """
+    if isinstance(orientations, Orientations):
+        return orientations.get_quats()
+    return eulers_to_quats(orientations)
@@ -0,0 +1,117 @@
+"""
+ Title:         Parallel
+ Description:   For computing disorientations of large lists of orientation pairs over multiple processes
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from crystalyser.csl import get_disorientations, get_quat_disorientations, check_symmetry_type
+
+def create_shared_array(shape:tuple, source:np.ndarray=None, dtype:type=float) -> tuple:
+    """
+    Creates an array backed by shared memory
+
+    Parameters:
+    * `shape`:  The shape of the array
+    * `source`: The optional values to copy into the array
+    * `dtype`:  The type of the values
+
+    Returns the shared memory block and the array
+    """
+    num_bytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    shared_memory = SharedMemory(create=True, size=num_bytes)
+    array = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+    if source is not None:
+        array[:] = source
+    return shared_memory, array
+
+def run_disorientation_task(task:tuple) -> None:
+    """
+    Computes the disorientations of a slice of the shared orientation pairs
+    and writes them into the shared output; run by each worker
+
+    Parameters:
+    * `task`: The tuple of the shared memory names, the number of pairs,
+              the slice bounds, the crystal structure type, the method,
+              and the chunk size
+    """
+
+    # Attach to the shared memory
+    names, num_pairs, start, end, type, method, chunk_size = task
+    shared_memories = [SharedMemory(name=name) for name in names]
+    shapes = [(num_pairs, 3), (num_pairs, 3), (num_pairs,), (num_pairs, 3) if method == "quat" else (0,)]
+    arrays = [np.ndarray(shape, dtype=float, buffer=shared_memory.buf) for shape, shared_memory in zip(shapes, shared_memories)]
+
+    # Compute the disorientations of the slice
+    eulers_1, eulers_2, disorientations = arrays[0][start:end], arrays[1][start:end], arrays[2]
+    if method == "matrix":
+        disorientations[start:end] = get_disorientations(eulers_1, eulers_2, type, chunk_size)
+    else:
+        disorientations[start:end], arrays[3][start:end] = get_quat_disorientations(eulers_1, eulers_2, type, chunk_size)
+
+    # Detach from the shared memory
+    del eulers_1, eulers_2, disorientations, arrays
+    for shared_memory in shared_memories:
+        shared_memory.close()
+
+def get_disorientations_parallel(eulers_1:np.ndarray, eulers_2:np.ndarray, type:str, method:str="matrix",
+                                 num_workers:int=None, chunk_size:int=100000):
+    """
+    Determines the disorientations of many pairs of euler angles (rads) over
+    a pool of processes; the inputs are passed through shared memory rather
+    than being pickled, and the results are identical to the serial functions
+
+    Parameters:
+    * `eulers_1`:    The first euler angles, as an (N,3) array (rads)
+    * `eulers_2`:    The second euler angles, as an (N,3) array (rads)
+    * `type`:        The crystal structure type
+    * `method`:      The disorientation method ("matrix" or "quat")
+    * `num_workers`: The number of processes; uses the number of CPUs if unspecified
+    * `chunk_size`:  The number of pairs per task
+
+    Returns the disorientation angles as an (N,) array, and also the
+    disorientation axes as an (N,3) array if the method is "quat"
+    """
+
+    # Check inputs
+    check_symmetry_type(type)
+    if not method in ["matrix", "quat"]:
+        raise ValueError(f"The method '{method}' is not supported!")
+    eulers_1 = np.asarray(eulers_1, dtype=float)
+    eulers_2 = np.asarray(eulers_2, dtype=float)
+    if eulers_1.shape != eulers_2.shape:
+        raise ValueError("Shapes of euler angle arrays do not match!")
+
+    # Copy inputs into shared memory and allocate shared outputs
+    num_pairs = len(eulers_1)
+    shared_list = [
+        create_shared_array((num_pairs, 3), eulers_1),
+        create_shared_array((num_pairs, 3), eulers_2),
+        create_shared_array((num_pairs,)),
+        create_shared_array((num_pairs, 3) if method == "quat" else (0,)),
+    ]
+    shared_memories = [shared_memory for shared_memory, _ in shared_list]
+    names = [shared_memory.name for shared_memory in shared_memories]
+
+    # Dispatch chunks to the process pool
+    try:
+        tasks = [(names, num_pairs, start, min(start + chunk_size, num_pairs), type, method, chunk_size)
+                 for start in range(0, num_pairs, chunk_size)]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(run_disorientation_task, tasks))
+        disorientations = shared_list[2][1].copy()
+        axes = shared_list[3][1].copy() if method == "quat" else None
+
+    # Release the shared memory
+    finally:
+        del shared_list
+        for shared_memory in shared_memories:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    # Return
+    return (disorientations, axes) if method == "quat" else disorientations
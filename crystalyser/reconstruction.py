@@ -0,0 +1,209 @@
+"""
+ Title:         Reconstruction
+ Description:   For reconstructing grains from pixel-level EBSD orientation maps
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from crystalyser.csl import get_quat_angles, check_symmetry_type
+from crystalyser.orientation import eulers_to_quats, quats_to_matrices, matrices_to_eulers
+from crystalyser.trajectory import align_quats
+
+def get_neighbour_disorientations(eulers:np.ndarray, type:str, chunk_size:int=100000) -> tuple:
+    """
+    Determines the disorientations between each pixel of a map and its right
+    and lower neighbours, processing a band of rows at a time
+
+    Parameters:
+    * `eulers`:     The euler angles of the pixels, as an (H,W,3) array (rads);
+                    can be memory-mapped
+    * `type`:       The crystal structure type
+    * `chunk_size`: The approximate number of pixels to process at once
+
+    Returns the disorientations with the right neighbours as an (H,W-1) array
+    and with the lower neighbours as an (H-1,W) array
+    """
+    height, width = eulers.shape[:2]
+    rights = np.empty((height, max(width-1, 0)))
+    downs = np.empty((max(height-1, 0), width))
+    num_rows = max(chunk_size // max(width, 1), 1)
+    for start in range(0, height, num_rows):
+        end = min(start + num_rows, height)
+        quats = eulers_to_quats(eulers[start:min(end+1, height)])
+        rights[start:end] = get_quat_angles(quats[:end-start,:-1], quats[:end-start,1:], type)
+        downs[start:min(end, height-1)] = get_quat_angles(quats[:-1], quats[1:], type)[:min(end, height-1)-start]
+    return rights, downs
+
+def get_roots(parents:np.ndarray) -> np.ndarray:
+    """
+    Points every node directly to the root of its tree (i.e., pointer jumping)
+
+    Parameters:
+    * `parents`: The parents of the nodes
+
+    Returns the roots of the nodes
+    """
+    while True:
+        grandparents = parents[parents]
+        if np.array_equal(grandparents, parents):
+            return parents
+        parents = grandparents
+
+def get_unions(num_nodes:int, nodes_1:np.ndarray, nodes_2:np.ndarray) -> np.ndarray:
+    """
+    Merges the connected nodes with a vectorised union-find; in each pass,
+    the larger root of every edge is hooked onto the smallest root it is
+    connected to, followed by pointer jumping, so the number of passes
+    grows logarithmically with the number of nodes
+
+    Parameters:
+    * `num_nodes`: The number of nodes
+    * `nodes_1`:   The first nodes of the edges
+    * `nodes_2`:   The second nodes of the edges
+
+    Returns the roots of the nodes; each root is the smallest node of its tree
+    """
+    parents = np.arange(num_nodes)
+    while len(nodes_1) > 0:
+        roots_1, roots_2 = parents[nodes_1], parents[nodes_2]
+        is_split = roots_1 != roots_2
+        nodes_1, nodes_2 = nodes_1[is_split], nodes_2[is_split]
+        roots_1, roots_2 = roots_1[is_split], roots_2[is_split]
+        np.minimum.at(parents, np.maximum(roots_1, roots_2), np.minimum(roots_1, roots_2))
+        parents = get_roots(parents)
+    return parents
+
+def get_grouped_means(quats:np.ndarray, labels:np.ndarray, type:str, num_groups:int=None, num_iterations:int=2,
+                      chunk_size:int=100000, converter=None) -> tuple:
+    """
+    Determines the mean orientation and orientation spread of each group of
+    orientations (e.g., the pixels of each grain) in one pass over the groups;
+    the orientations are aligned to the closest symmetric variant of a reference
+    orientation of their group before their quaternions are summed, and the
+    reference is refined to the mean in each iteration; the orientations and
+    labels are only read a chunk at a time, so they can be memory-mapped
+
+    Parameters:
+    * `quats`:          The quaternions, as an (N,4) array of [x, y, z, w]
+    * `labels`:         The group of each quaternion, as an (N,) array; negative labels are ignored
+    * `type`:           The crystal structure type
+    * `num_groups`:     The number of groups; determined from the labels if unspecified
+    * `num_iterations`: The number of times to align the orientations to the reference;
+                        the first reference is the first orientation of each group
+    * `chunk_size`:     The number of orientations to align at once
+    * `converter`:      The optional function that converts each chunk of the orientations
+                        into quaternions (e.g., `eulers_to_quats`)
+
+    Returns the mean quaternions as a (G,4) array, and the mean disorientation from
+    the mean orientation of each group (i.e., the spread) as a (G,) array (rads);
+    nan for empty groups
+    """
+
+    # Define the chunks of the orientations
+    labels = np.asarray(labels).reshape(-1)
+    starts = range(0, len(labels), chunk_size)
+    converter = (lambda quats : quats) if converter == None else converter
+    get_chunk = lambda start : np.asarray(converter(quats[start:start+chunk_size]), dtype=float).reshape(-1, 4)
+    if num_groups == None:
+        num_groups = max([int(labels[start:start+chunk_size].max(initial=-1)) for start in starts], default=-1) + 1
+
+    # Initialise the references with the first orientation of each group
+    references = np.full((num_groups, 4), np.nan)
+    counts = np.zeros(num_groups, dtype=int)
+    for start in starts:
+        chunk_labels = np.asarray(labels[start:start+chunk_size])
+        is_valid = chunk_labels >= 0
+        chunk_labels = chunk_labels[is_valid]
+        groups, first_indexes = np.unique(chunk_labels, return_index=True)
+        is_new = counts[groups] == 0
+        if np.any(is_new):
+            references[groups[is_new]] = get_chunk(start)[is_valid][first_indexes[is_new]]
+        counts += np.bincount(chunk_labels, minlength=num_groups)
+
+    # Sum the aligned quaternions of each group
+    for _ in range(num_iterations):
+        sums = np.zeros((num_groups, 4))
+        for start in starts:
+            chunk_labels = np.asarray(labels[start:start+chunk_size])
+            is_valid = chunk_labels >= 0
+            chunk_labels = chunk_labels[is_valid]
+            aligned = align_quats(get_chunk(start)[is_valid], references[chunk_labels], type)
+            for i in range(4):
+                sums[:,i] += np.bincount(chunk_labels, weights=aligned[:,i], minlength=num_groups)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        references = np.divide(sums, norms, out=np.full(sums.shape, np.nan), where=norms > 0)
+
+    # Average the disorientations from the means
+    angle_sums = np.zeros(num_groups)
+    for start in starts:
+        chunk_labels = np.asarray(labels[start:start+chunk_size])
+        is_valid = chunk_labels >= 0
+        chunk_labels = chunk_labels[is_valid]
+        angles = get_quat_angles(get_chunk(start)[is_valid], references[chunk_labels], type)
+        angle_sums += np.bincount(chunk_labels, weights=angles, minlength=num_groups)
+    spreads = np.divide(angle_sums, counts, out=np.full(num_groups, np.nan), where=counts > 0)
+    return references, spreads
+
+def get_grain_means(eulers:np.ndarray, grain_ids:np.ndarray, num_grains:int, type:str, chunk_size:int=100000) -> np.ndarray:
+    """
+    Determines the mean orientation of each grain; see `get_grouped_means`
+
+    Parameters:
+    * `eulers`:     The euler angles of the pixels, as an (H,W,3) array (rads);
+                    can be memory-mapped
+    * `grain_ids`:  The grain IDs of the pixels, as an (H,W) array; negative IDs are ignored;
+                    can be memory-mapped
+    * `num_grains`: The number of grains; determined from the grain IDs if None
+    * `type`:       The crystal structure type
+    * `chunk_size`: The number of pixels to align at once
+
+    Returns the mean euler angles as a (G,3) array (rads)
+    """
+    eulers = np.asarray(eulers).reshape(-1, 3)
+    means, _ = get_grouped_means(eulers, grain_ids, type, num_grains, chunk_size=chunk_size, converter=eulers_to_quats)
+    return matrices_to_eulers(quats_to_matrices(means))
+
+def reconstruct_grains(eulers:np.ndarray, type:str="cubic", threshold:float=np.radians(5), mask:np.ndarray=None,
+                       chunk_size:int=100000) -> tuple:
+    """
+    Reconstructs grains from a map of pixel orientations, by merging neighbouring
+    pixels with disorientations below the threshold
+
+    Parameters:
+    * `eulers`:     The euler angles of the pixels, as an (H,W,3) array (rads);
+                    can be memory-mapped
+    * `type`:       The crystal structure type
+    * `threshold`:  The maximum disorientation between pixels of the same grain (rads)
+    * `mask`:       The optional (H,W) boolean array of the pixels to index;
+                    defaults to the pixels with finite euler angles
+    * `chunk_size`: The approximate number of pixels to process at once
+
+    Returns the grain IDs of the pixels as an (H,W) array (-1 for unindexed pixels),
+    the number of pixels of each grain, and the mean euler angles of each grain
+    as a (G,3) array (rads); grains are numbered in the order of their first pixel
+    """
+
+    # Determine the connected pixels
+    check_symmetry_type(type)
+    height, width = eulers.shape[:2]
+    if mask is None:
+        mask = np.all(np.isfinite(eulers), axis=2)
+    rights, downs = get_neighbour_disorientations(eulers, type, chunk_size)
+    is_right = (rights < threshold) & mask[:,:-1] & mask[:,1:]
+    is_down = (downs < threshold) & mask[:-1] & mask[1:]
+
+    # Merge the connected pixels
+    pixels = np.arange(height * width).reshape(height, width)
+    nodes_1 = np.concatenate([pixels[:,:-1][is_right], pixels[:-1][is_down]])
+    nodes_2 = np.concatenate([pixels[:,1:][is_right], pixels[1:][is_down]])
+    roots = get_unions(height * width, nodes_1, nodes_2)
+
+    # Number the grains and determine their sizes and orientations
+    grain_ids = np.full(height * width, -1)
+    _, grain_ids[mask.reshape(-1)] = np.unique(roots[mask.reshape(-1)], return_inverse=True)
+    grain_ids = grain_ids.reshape(height, width)
+    sizes = np.bincount(grain_ids[mask])
+    means = get_grain_means(eulers, grain_ids, len(sizes), type, chunk_size)
+    return grain_ids, sizes, means
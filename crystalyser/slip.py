@@ -0,0 +1,152 @@
+"""
+ Title:         Slip
+ Description:   For determining the Schmid factors and resolved shear stresses of slip systems
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+import itertools
+from crystalyser.csl import get_frozen
+from crystalyser.orientations import to_matrices
+
+# Families of slip planes and directions of each crystal structure
+SLIP_FAMILIES = {
+    "fcc": [((1,1,1), (1,1,0))],
+    "bcc": [((1,1,0), (1,1,1)), ((1,1,2), (1,1,1)), ((1,2,3), (1,1,1))],
+}
+
+def get_family(indices:tuple) -> np.ndarray:
+    """
+    Gets the crystallographically equivalent vectors of a family of planes or
+    directions in a cubic crystal, keeping one of each pair of opposite vectors
+
+    Parameters:
+    * `indices`: The miller indices of the family
+
+    Returns the vectors as an (M,3) integer array
+    """
+    vector_list = []
+    for permutation in set(itertools.permutations(indices)):
+        for signs in itertools.product([1, -1], repeat=3):
+            vector = tuple(np.multiply(permutation, signs).tolist())
+            if not vector in vector_list and not tuple(-np.array(vector)) in vector_list:
+                vector_list.append(vector)
+    return np.array(sorted(vector_list, reverse=True))
+
+def get_slip_indices(structure:str="fcc") -> tuple:
+    """
+    Gets the miller indices of the slip systems of a crystal structure
+
+    Parameters:
+    * `structure`: The crystal structure ("fcc" or "bcc")
+
+    Returns the plane normals and slip directions as (S,3) integer arrays
+    """
+    if not structure in SLIP_FAMILIES.keys():
+        raise ValueError(f"The crystal structure '{structure}' is not supported!")
+    normal_list, direction_list = [], []
+    for plane_indices, direction_indices in SLIP_FAMILIES[structure]:
+        for normal in get_family(plane_indices):
+            for direction in get_family(direction_indices):
+                if np.dot(normal, direction) == 0:
+                    normal_list.append(normal)
+                    direction_list.append(direction)
+    return np.array(normal_list), np.array(direction_list)
+
+def get_slip_labels(structure:str="fcc") -> list:
+    """
+    Gets the labels of the slip systems of a crystal structure (e.g., "(1-11)[011]")
+
+    Parameters:
+    * `structure`: The crystal structure ("fcc" or "bcc")
+
+    Returns the list of labels
+    """
+    to_label = lambda vector : "".join([str(index) for index in vector])
+    return [f"({to_label(normal)})[{to_label(direction)}]" for normal, direction in zip(*get_slip_indices(structure))]
+
+def get_slip_systems(structure:str="fcc") -> tuple:
+    """
+    Gets the unit plane normals and slip directions of the slip systems of a crystal structure
+
+    Parameters:
+    * `structure`: The crystal structure ("fcc" or "bcc")
+
+    Returns the plane normals and slip directions as read-only (S,3) arrays
+    """
+    if not structure in SLIP_SYSTEMS.keys():
+        raise ValueError(f"The crystal structure '{structure}' is not supported!")
+    return SLIP_SYSTEMS[structure]
+
+def get_schmid_factors(eulers:np.ndarray, loading_direction:np.ndarray, structure:str="fcc") -> np.ndarray:
+    """
+    Determines the Schmid factors of every slip system of many orientations at once;
+    the orientations can have any leading shape (e.g., strain steps by grains)
+
+    Parameters:
+    * `eulers`:            The euler-bunge angles, as an (...,3) array (rads), or the orientations
+    * `loading_direction`: The loading direction in the sample frame, as a (3,) array
+                           or an array broadcastable to (...,3)
+    * `structure`:         The crystal structure ("fcc" or "bcc")
+
+    Returns the Schmid factors as an (...,S) array; the sign gives the sense of slip
+    """
+    normals, directions = get_slip_systems(structure)
+    loading_direction = np.asarray(loading_direction, dtype=float)
+    loading_direction = loading_direction / np.linalg.norm(loading_direction, axis=-1, keepdims=True)
+    crystal_directions = np.einsum("...ij,...j->...i", to_matrices(eulers), loading_direction)
+    return np.einsum("...i,si->...s", crystal_directions, normals) * np.einsum("...i,si->...s", crystal_directions, directions)
+
+def get_dominant_systems(schmid_factors:np.ndarray) -> tuple:
+    """
+    Gets the slip systems with the largest absolute Schmid factors
+
+    Parameters:
+    * `schmid_factors`: The Schmid factors, as an (...,S) array
+
+    Returns the indexes of the dominant slip systems as an (...) array
+    and their absolute Schmid factors as an (...) array
+    """
+    absolute_factors = np.abs(schmid_factors)
+    indexes = np.argmax(absolute_factors, axis=-1)
+    return indexes, np.take_along_axis(absolute_factors, indexes[...,None], -1)[...,0]
+
+def get_resolved_shear_stresses(eulers:np.ndarray, stresses:np.ndarray, loading_direction:np.ndarray=None,
+                                structure:str="fcc") -> np.ndarray:
+    """
+    Determines the resolved shear stresses on every slip system of many orientations at once
+
+    Parameters:
+    * `eulers`:            The euler-bunge angles, as an (...,3) array (rads), or the orientations
+    * `stresses`:          The uniaxial stresses broadcastable to (...) if the loading direction
+                           is specified, or otherwise the stress tensors in the sample frame
+                           broadcastable to (...,3,3)
+    * `loading_direction`: The loading direction of the uniaxial stresses in the sample frame
+    * `structure`:         The crystal structure ("fcc" or "bcc")
+
+    Returns the resolved shear stresses as an (...,S) array
+    """
+    stresses = np.asarray(stresses, dtype=float)
+    if loading_direction is not None:
+        return stresses[...,None] * get_schmid_factors(eulers, loading_direction, structure)
+    normals, directions = get_slip_systems(structure)
+    schmid_tensors = 0.5 * (np.einsum("si,sj->sij", directions, normals) + np.einsum("si,sj->sij", normals, directions))
+    matrices = to_matrices(eulers)
+    crystal_stresses = np.einsum("...ik,...kl,...jl->...ij", matrices, stresses, matrices)
+    return np.einsum("...ij,sij->...s", crystal_stresses, schmid_tensors)
+
+def get_unit_vectors(vectors:np.ndarray) -> np.ndarray:
+    """
+    Normalises vectors into read-only unit vectors
+
+    Parameters:
+    * `vectors`: The vectors, as an (M,3) array
+
+    Returns the unit vectors as a read-only (M,3) array
+    """
+    return get_frozen(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+
+# Precomputed unit slip systems of each crystal structure
+SLIP_SYSTEMS = {structure: tuple(get_unit_vectors(vectors) for vectors in get_slip_indices(structure)) for structure in SLIP_FAMILIES.keys()}
@@ -0,0 +1,177 @@
+"""
+ Title:         Tensile
+ Description:   For conditioning tensile and creep curves using array operations
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def get_true_curve(strains:np.ndarray, stresses:np.ndarray) -> tuple:
+    """
+    Converts engineering strains and stresses into true strains and stresses
+
+    Parameters:
+    * `strains`:  The engineering strains
+    * `stresses`: The engineering stresses
+
+    Returns the true strains and stresses as arrays
+    """
+    strains = np.asarray(strains, dtype=float)
+    stresses = np.asarray(stresses, dtype=float)
+    return np.log1p(strains), stresses * (1 + strains)
+
+def get_window_bounds(num_samples:int, num_points:int) -> tuple:
+    """
+    Gets the bounds of windows centred on evenly spaced samples; neighbouring
+    windows overlap by one sample when the spacing is even
+
+    Parameters:
+    * `num_samples`: The number of samples
+    * `num_points`:  The number of windows
+
+    Returns the lower and upper (inclusive) indexes of the windows
+    """
+    interval_size = num_samples // num_points
+    centres = interval_size * np.arange(1, num_points+1)
+    lower_indexes = np.clip(centres - interval_size//2, 0, num_samples-1)
+    upper_indexes = np.clip(centres + interval_size//2, 0, num_samples-1)
+    return lower_indexes, upper_indexes
+
+def get_peak_indexes(values:np.ndarray, num_points:int=40) -> np.ndarray:
+    """
+    Gets the index of the (first) maximum value in each window from `get_window_bounds`;
+    useful for converting in-situ EBSD tensile data, which relaxes during each
+    mapping step, into a normal tensile curve
+
+    Parameters:
+    * `values`:     The values (e.g., stresses)
+    * `num_points`: The number of windows
+
+    Returns the indexes of the peak values
+    """
+
+    # Pad the values so that every window has the same size
+    values = np.asarray(values, dtype=float)
+    lower_indexes, upper_indexes = get_window_bounds(len(values), num_points)
+    window_size = 2 * (len(values) // num_points // 2) + 1
+    padded = np.full(max(len(values), lower_indexes[-1] + window_size), -np.inf)
+    padded[:len(values)] = values
+
+    # Find the maximum of each window, ignoring the padding
+    windows = sliding_window_view(padded, window_size)[lower_indexes]
+    return lower_indexes + np.argmax(windows, axis=1)
+
+def get_window_means(values:np.ndarray, num_points:int=40) -> np.ndarray:
+    """
+    Gets the mean value of each window from `get_window_bounds`
+
+    Parameters:
+    * `values`:     The values, as an (N,) or (N,K) array
+    * `num_points`: The number of windows
+
+    Returns the mean values, as a (num_points,) or (num_points,K) array
+    """
+    values = np.asarray(values, dtype=float)
+    lower_indexes, upper_indexes = get_window_bounds(len(values), num_points)
+    cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    counts = (upper_indexes - lower_indexes + 1).reshape((-1,) + (1,) * (values.ndim - 1))
+    return (cumulative[upper_indexes+1] - cumulative[lower_indexes]) / counts
+
+def get_strain_rates(times:np.ndarray, strains:np.ndarray, window_size:int=1) -> np.ndarray:
+    """
+    Estimates the strain rates using central differences, which are
+    one-sided at the ends of the curve
+
+    Parameters:
+    * `times`:       The times
+    * `strains`:     The strains
+    * `window_size`: The number of samples on either side of each sample to
+                     difference over; larger values suppress noise
+
+    Returns the strain rates; nan where the times do not change
+    """
+    times = np.asarray(times, dtype=float)
+    strains = np.asarray(strains, dtype=float)
+    indexes = np.arange(len(times))
+    lower_indexes = np.maximum(indexes - window_size, 0)
+    upper_indexes = np.minimum(indexes + window_size, len(times) - 1)
+    time_changes = times[upper_indexes] - times[lower_indexes]
+    strain_changes = strains[upper_indexes] - strains[lower_indexes]
+    return np.divide(strain_changes, time_changes, out=np.full(len(times), np.nan), where=time_changes != 0)
+
+# The WindowReducer Class
+class WindowReducer:
+
+    def __init__(self, window_size:int, mode:str="peak", y_index:int=-1):
+        """
+        Class for reducing columns that arrive in chunks (e.g., long DAQ logs)
+        into one row per window of consecutive rows, such that the full data
+        never needs to be held in memory; each window is reduced to the row
+        with its maximum value ("peak") or to the mean of its rows ("mean")
+
+        Parameters:
+        * `window_size`: The number of rows per window
+        * `mode`:        The reduction mode ("peak" or "mean")
+        * `y_index`:     The index of the column whose maximum is kept
+        """
+        if not mode in ["peak", "mean"]:
+            raise ValueError(f"The reduction mode '{mode}' is not supported!")
+        self.window_size = window_size
+        self.mode = mode
+        self.y_index = y_index
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the state of the reducer
+        """
+        self.remainder = None
+
+    def reduce(self, data:np.ndarray) -> np.ndarray:
+        """
+        Reduces rows; only the last window may be incomplete
+
+        Parameters:
+        * `data`: The rows, as an (N,K) array
+
+        Returns the reduced rows
+        """
+        starts = np.arange(0, len(data), self.window_size)
+        if len(data) == 0:
+            return data
+        if self.mode == "mean":
+            return np.add.reduceat(data, starts, axis=0) / np.diff(np.append(starts, len(data)))[:,None]
+        padded = np.full(len(starts) * self.window_size, -np.inf)
+        padded[:len(data)] = data[:,self.y_index]
+        peak_indexes = starts + np.argmax(padded.reshape(-1, self.window_size), axis=1)
+        return data[peak_indexes]
+
+    def add(self, data:np.ndarray) -> np.ndarray:
+        """
+        Adds a chunk of rows
+
+        Parameters:
+        * `data`: The rows, as an (N,K) array
+
+        Returns the reduced rows from the completed windows
+        """
+        data = np.asarray(data, dtype=float)
+        data = data if self.remainder is None else np.concatenate([self.remainder, data])
+        num_complete = (len(data) // self.window_size) * self.window_size
+        self.remainder = data[num_complete:]
+        return self.reduce(data[:num_complete])
+
+    def finish(self) -> np.ndarray:
+        """
+        Flushes the incomplete window and resets the reducer
+
+        Returns the remaining reduced rows
+        """
+        if self.remainder is None:
+            return np.zeros((0, 0))
+        reduced = self.reduce(self.remainder)
+        self.reset()
+        return reduced
@@ -0,0 +1,285 @@
+"""
+ Title:         Trajectory
+ Description:   For interpolating and storing the orientation trajectories of many grains
+ Author:        Janzen Choi
+
+"""
+
+# Libraries
+import numpy as np
+import os, re
+from crystalyser.csl import get_symmetry_quats
+from crystalyser.helper import read_csv_columns, write_csv_columns
+from crystalyser.orientation import get_quat_products, quats_to_matrices, matrices_to_eulers
+from crystalyser.orientations import to_quats
+
+# Names of the euler angle columns of each grain
+EULER_FIELDS = ["phi_1", "Phi", "phi_2"]
+
+def align_quats(quats:np.ndarray, references:np.ndarray, type:str=None) -> np.ndarray:
+    """
+    Replaces each quaternion with its symmetrically equivalent variant that is
+    closest to the reference quaternion, with the same hemisphere as the reference
+
+    Parameters:
+    * `quats`:      The quaternions, as an (N,4) array of [x, y, z, w]
+    * `references`: The reference quaternions, as an (N,4) array of [x, y, z, w]
+    * `type`:       The crystal structure type; only the sign is aligned if unspecified
+
+    Returns the aligned quaternions as an (N,4) array
+    """
+    quats = np.asarray(quats, dtype=float)
+    references = np.asarray(references, dtype=float)
+    if type == None:
+        dots = np.einsum("ni,ni->n", quats, references)
+        return np.where(dots[:,None] < 0, -quats, quats)
+    variants = get_quat_products(get_symmetry_quats(type)[None,:,:], quats[:,None,:])
+    dots = np.einsum("ngi,ni->ng", variants, references)
+    best = np.argmax(np.abs(dots), axis=1)
+    indexes = np.arange(len(quats))
+    signs = np.where(dots[indexes, best] < 0, -1.0, 1.0)
+    return variants[indexes, best] * signs[:,None]
+
+def get_keyframe_quats(keyframes:list, type:str=None) -> np.ndarray:
+    """
+    Converts the keyframe orientations of many grains into quaternions, such that
+    each keyframe is aligned with the previous keyframe; this avoids interpolating
+    across the wrap-around of the euler angles or between symmetric variants
+
+    Parameters:
+    * `keyframes`: The list of K keyframes, each as an (N,3) array of euler angles (rads) or orientations
+    * `type`:      The crystal structure type; only the sign is aligned if unspecified
+
+    Returns the aligned quaternions as a (K,N,4) array
+    """
+    quats_list = [to_quats(keyframes[0])]
+    for keyframe in keyframes[1:]:
+        quats_list.append(align_quats(to_quats(keyframe), quats_list[-1], type))
+    return np.stack(quats_list)
+
+def slerp_quats(quats_1:np.ndarray, quats_2:np.ndarray, fractions:np.ndarray) -> np.ndarray:
+    """
+    Spherically interpolates between many pairs of quaternions; the pairs are
+    assumed to be in the same hemisphere
+
+    Parameters:
+    * `quats_1`:   The starting quaternions, as an (...,4) array of [x, y, z, w]
+    * `quats_2`:   The ending quaternions, as an (...,4) array of [x, y, z, w]
+    * `fractions`: The interpolation fractions between 0 and 1, broadcastable to (...)
+
+    Returns the interpolated quaternions as an (...,4) array
+    """
+    quats_1, quats_2 = np.asarray(quats_1, dtype=float), np.asarray(quats_2, dtype=float)
+    fractions = np.asarray(fractions, dtype=float)[...,None]
+    dots = np.clip(np.sum(quats_1 * quats_2, axis=-1, keepdims=True), -1, 1)
+    angles = np.arccos(dots)
+    sines = np.sin(angles)
+
+    # Use the weights of the linear interpolation for nearly identical quaternions
+    is_close = sines < 1e-9
+    safe_sines = np.where(is_close, 1, sines)
+    weights_1 = np.where(is_close, 1 - fractions, np.sin((1 - fractions) * angles) / safe_sines)
+    weights_2 = np.where(is_close, fractions, np.sin(fractions * angles) / safe_sines)
+    quats = weights_1 * quats_1 + weights_2 * quats_2
+    return quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+
+def get_quat_trajectories(keyframes:list, keyframe_strains:list, strains:list, type:str=None) -> np.ndarray:
+    """
+    Gets the piecewise spherical trajectories of the orientations of many grains
+
+    Parameters:
+    * `keyframes`:        The list of K keyframes, each as an (N,3) array of euler angles (rads) or orientations
+    * `keyframe_strains`: The K increasing strains of the keyframes
+    * `strains`:          The M strains to sample the trajectories at; strains outside
+                          the keyframe strains take the orientations of the nearest keyframe
+    * `type`:             The crystal structure type; only the sign is aligned if unspecified
+
+    Returns the quaternions as an (M,N,4) array
+    """
+
+    # Check inputs
+    keyframe_strains = np.asarray(keyframe_strains, dtype=float)
+    strains = np.asarray(strains, dtype=float)
+    if len(keyframes) != len(keyframe_strains) or len(keyframes) < 2:
+        raise ValueError("There must be at least two keyframes, each with one strain!")
+    if np.any(np.diff(keyframe_strains) <= 0):
+        raise ValueError("The keyframe strains must be increasing!")
+
+    # Locate the segment and fraction of each strain
+    keyframe_quats = get_keyframe_quats(keyframes, type)
+    segments = np.clip(np.searchsorted(keyframe_strains, strains, side="right") - 1, 0, len(keyframe_strains) - 2)
+    fractions = (strains - keyframe_strains[segments]) / (keyframe_strains[segments+1] - keyframe_strains[segments])
+    fractions = np.clip(fractions, 0, 1)
+
+    # Interpolate all grains at all strains at once
+    return slerp_quats(keyframe_quats[segments], keyframe_quats[segments+1], fractions[:,None])
+
+def get_trajectories(keyframes:list, keyframe_strains:list, strains:list, type:str=None) -> np.ndarray:
+    """
+    Gets the piecewise spherical trajectories of the orientations of many grains
+    as euler angles; see `get_quat_trajectories`
+
+    Parameters:
+    * `keyframes`:        The list of K keyframes, each as an (N,3) array of euler angles (rads) or orientations
+    * `keyframe_strains`: The K increasing strains of the keyframes
+    * `strains`:          The M strains to sample the trajectories at
+    * `type`:             The crystal structure type; only the sign is aligned if unspecified
+
+    Returns the euler-bunge angles as an (M,N,3) array (rads)
+    """
+    quats = get_quat_trajectories(keyframes, keyframe_strains, strains, type)
+    return matrices_to_eulers(quats_to_matrices(quats))
+
+# The TrajectoryStore Class
+class TrajectoryStore:
+
+    def __init__(self, grain_ids:np.ndarray, eulers:np.ndarray):
+        """
+        Class for storing the orientation trajectories of many grains in a single
+        (n_grains, n_steps, 3) array, rather than three columns per grain
+
+        Parameters:
+        * `grain_ids`: The IDs of the grains, as an (N,) array
+        * `eulers`:    The euler-bunge angles, as an (N,S,3) array (rads)
+        """
+        self.grain_ids = np.asarray(grain_ids, dtype=int)
+        self.eulers = np.asarray(eulers)
+        if self.eulers.ndim != 3 or self.eulers.shape[0] != len(self.grain_ids) or self.eulers.shape[2] != 3:
+            raise ValueError("The euler angles must be an (n_grains, n_steps, 3) array!")
+        self.index_dict = {grain_id: i for i, grain_id in enumerate(self.grain_ids.tolist())}
+
+    @classmethod
+    def from_dict(cls, data_dict:dict):
+        """
+        Creates the store from a dictionary with three columns per grain (e.g.,
+        `g27_phi_1`, `g27_Phi`, and `g27_phi_2`); shorter columns are padded with
+        their last value, and columns of other fields are ignored
+
+        Parameters:
+        * `data_dict`: The dictionary of columns
+
+        Returns the store
+        """
+        grain_ids = [int(key[1:-6]) for key in data_dict.keys() if re.fullmatch(r"g\d+_phi_1", key)]
+        column_list = [np.atleast_1d(np.asarray(data_dict[f"g{grain_id}_{field}"], dtype=float))
+                       for grain_id in grain_ids for field in EULER_FIELDS]
+        num_steps = max([len(column) for column in column_list], default=0)
+        eulers = np.array([np.pad(column, (0, num_steps - len(column)), mode="edge") for column in column_list])
+        return cls(grain_ids, np.ascontiguousarray(eulers.reshape(len(grain_ids), 3, num_steps).transpose(0, 2, 1)))
+
+    @classmethod
+    def from_csv(cls, csv_path:str):
+        """
+        Creates the store from a CSV file with three columns per grain
+
+        Parameters:
+        * `csv_path`: The path to the CSV file
+
+        Returns the store
+        """
+        return cls.from_dict(read_csv_columns(csv_path))
+
+    @classmethod
+    def load(cls, directory_path:str, mmap:bool=True):
+        """
+        Loads a store saved by `save`
+
+        Parameters:
+        * `directory_path`: The path to the directory
+        * `mmap`:           Whether to memory-map the euler angles rather than reading them
+
+        Returns the store
+        """
+        grain_ids = np.load(os.path.join(directory_path, "grain_ids.npy"), allow_pickle=False)
+        eulers = np.load(os.path.join(directory_path, "eulers.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+        return cls(grain_ids, eulers)
+
+    def save(self, directory_path:str) -> None:
+        """
+        Saves the store into a directory of memory-mappable .npy files
+
+        Parameters:
+        * `directory_path`: The path to the directory
+        """
+        os.makedirs(directory_path, exist_ok=True)
+        np.save(os.path.join(directory_path, "grain_ids.npy"), self.grain_ids, allow_pickle=False)
+        np.save(os.path.join(directory_path, "eulers.npy"), self.eulers, allow_pickle=False)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of grains
+        """
+        return len(self.grain_ids)
+
+    def get_num_steps(self) -> int:
+        """
+        Returns the number of steps
+        """
+        return self.eulers.shape[1]
+
+    def get_grain(self, grain_id:int) -> np.ndarray:
+        """
+        Gets the trajectory of a grain
+
+        Parameters:
+        * `grain_id`: The ID of the grain
+
+        Returns the euler angles as an (S,3) array
+        """
+        return self.eulers[self.index_dict[grain_id]]
+
+    def get_grains(self, grain_ids:list) -> np.ndarray:
+        """
+        Gets the trajectories of many grains
+
+        Parameters:
+        * `grain_ids`: The IDs of the grains
+
+        Returns the euler angles as an (n,S,3) array
+        """
+        return self.eulers[[self.index_dict[grain_id] for grain_id in grain_ids]]
+
+    def get_step(self, step:int) -> np.ndarray:
+        """
+        Gets the orientations of all the grains at a step
+
+        Parameters:
+        * `step`: The index of the step
+
+        Returns the euler angles as an (N,3) array
+        """
+        return self.eulers[:,step]
+
+    def pad(self, num_steps:int):
+        """
+        Extends the trajectories by repeating their last orientations
+
+        Parameters:
+        * `num_steps`: The number of steps to extend the trajectories to
+
+        Returns the padded store
+        """
+        padding = max(num_steps - self.get_num_steps(), 0)
+        return TrajectoryStore(self.grain_ids, np.pad(self.eulers, ((0, 0), (0, padding), (0, 0)), mode="edge"))
+
+    def to_dict(self) -> dict:
+        """
+        Converts the store into a dictionary with three columns per grain
+
+        Returns the dictionary of lists
+        """
+        data_dict = {}
+        for grain_id, trajectory in zip(self.grain_ids.tolist(), self.eulers):
+            for i, field in enumerate(EULER_FIELDS):
+                data_dict[f"g{grain_id}_{field}"] = trajectory[:,i].tolist()
+        return data_dict
+
+    def to_csv(self, csv_path:str, float_format:str="%.17g") -> None:
+        """
+        Writes the store to a CSV file with three columns per grain
+
+        Parameters:
+        * `csv_path`:     The path to the CSV file
+        * `float_format`: The format of the euler angles; the default is lossless
+        """
+        write_csv_columns(self.to_dict(), csv_path, float_format=float_format)
@@ -0,0 +1,52 @@
+"""
+ Title:        Disorientation Benchmark
+ Description:  For comparing the speed of the matrix and quaternion disorientation paths
+ Author:       Janzen Choi
+
+"""
+
+# Libraries
+import sys; sys.path += [".."]
+import time
+import numpy as np
+from crystalyser.csl import get_disorientation, get_disorientations, get_quat_disorientations
+from crystalyser.orientation import random_eulers
+
+# Constants
+TYPE_LIST    = ["cubic", "hexagonal", "tetrahedral"]
+NUM_SCALAR   = 200
+NUM_BATCHED  = 100000
+RANDOM_SEED  = 0
+
+def get_time_per_pair(function, num_pairs:int) -> float:
+    """
+    Times a function and returns the time per pair
+
+    Parameters:
+    * `function`:  The function to time
+    * `num_pairs`: The number of pairs that the function processes
+
+    Returns the average time per pair in microseconds
+    """
+    start_time = time.perf_counter()
+    function()
+    return 1e6 * (time.perf_counter() - start_time) / num_pairs
+
+# Benchmark each crystal structure type
+rng = np.random.default_rng(RANDOM_SEED)
+print(f"{'type':<12} {'scalar (us)':>12} {'matrix (us)':>12} {'quat (us)':>12} {'speedup':>10} {'max diff':>10}")
+for type in TYPE_LIST:
+    eulers_1 = random_eulers(NUM_BATCHED, rng)
+    eulers_2 = random_eulers(NUM_BATCHED, rng)
+
+    # Time the scalar, batched matrix and quaternion paths
+    scalar_time = get_time_per_pair(lambda: [get_disorientation(list(e_1), list(e_2), type)
+                                             for e_1, e_2 in zip(eulers_1[:NUM_SCALAR], eulers_2[:NUM_SCALAR])], NUM_SCALAR)
+    matrix_time = get_time_per_pair(lambda: get_disorientations(eulers_1, eulers_2, type), NUM_BATCHED)
+    quat_time   = get_time_per_pair(lambda: get_quat_disorientations(eulers_1, eulers_2, type), NUM_BATCHED)
+
+    # Check agreement and print results
+    matrix_angles = get_disorientations(eulers_1, eulers_2, type)
+    quat_angles, _ = get_quat_disorientations(eulers_1, eulers_2, type)
+    max_diff = np.max(np.abs(matrix_angles - quat_angles))
+    print(f"{type:<12} {scalar_time:>12.3f} {matrix_time:>12.3f} {quat_time:>12.3f} {matrix_time/quat_time:>9.1f}x {max_diff:>10.1e}")
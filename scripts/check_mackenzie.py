@@ -0,0 +1,45 @@
+"""
+ Title:        Mackenzie Check
+ Description:  For checking that random orientation pairs give ratios of 1 to the random distribution
+ Author:       Janzen Choi
+
+"""
+
+# Libraries
+import sys; sys.path += [".."]
+import numpy as np
+from crystalyser.mdf import MDFAccumulator, get_mackenzie
+from crystalyser.orientation import random_eulers
+
+# Constants
+TYPE_LIST     = ["cubic", "hexagonal", "tetrahedral"]
+BINS_LIST     = [18, 180]
+NUM_PAIRS     = 1000000
+CHUNK_SIZE    = 100000
+MIN_EXPECTED  = 2000 # minimum expected count of a populated bin
+MAX_DEVIATION = 0.05
+RANDOM_SEED   = 0
+
+# Compare the distributions of random pairs with the random distributions
+rng = np.random.default_rng(RANDOM_SEED)
+print(f"{'type':<12} {'bins':>5} {'populated':>10} {'max deviation':>14} {'worst bin (deg)':>16}")
+is_passed = True
+for type in TYPE_LIST:
+    for num_bins in BINS_LIST:
+        accumulator = MDFAccumulator(type, num_bins=num_bins)
+        for _ in range(NUM_PAIRS // CHUNK_SIZE):
+            accumulator.add(random_eulers(CHUNK_SIZE, rng), random_eulers(CHUNK_SIZE, rng))
+
+        # Check the bins that are expected to have enough counts
+        expected = NUM_PAIRS * get_mackenzie(type, accumulator.bin_edges)
+        is_populated = expected >= MIN_EXPECTED
+        deviations = np.abs(accumulator.get_random_ratios()[is_populated] - 1)
+        worst = np.flatnonzero(is_populated)[np.argmax(deviations)]
+        worst_range = np.degrees(accumulator.bin_edges[worst:worst+2]).round(1)
+        is_passed = is_passed and deviations.max() <= MAX_DEVIATION
+        print(f"{type:<12} {num_bins:>5} {is_populated.sum():>10} {deviations.max():>14.4f} {str(worst_range):>16}")
+
+# Report
+if not is_passed:
+    raise ValueError(f"The random ratios deviate from 1 by more than {MAX_DEVIATION}!")
+print("All populated bins are within the tolerance")
@@ -11,6 +11,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from crystalyser.helper import csv_to_dict, dict_to_csv, round_sf, quick_spline
 from crystalyser.interpolator import Interpolator
+from crystalyser.tensile import get_peak_indexes
+from crystalyser.trajectory import TrajectoryStore
 
 # Paths
 TENSILE_PATH       = "./data/617_s1_tc.csv"
@@ -27,40 +29,12 @@ NUM_POINTS = 100
 RAW_STRAINS = [0.0, 0.003, 0.008, 0.022, 0.033, 0.036, 0.048, 0.075, 0.094, 0.110, 0.132, 0.144, 0.165, 0.189]
 NEXT_STRAIN = 0.20
 
-def process_tensile(strain_list:list, stress_list:list, num_points:int=40) -> list:
-    """
-    For converting in-situ EBSD tensile data into normal tensile data
-
-    Parameters:
-    * `strain_list`: The list of strain values
-    * `stress_list`: The list of stress values
-    * `num_points`:  Number of points to reduce the lists to
-    
-    Returns the lists of indexes corresponding to the chosen strain and stress values
-    """
-
-    # Initialise
-    interval_size = len(strain_list) // num_points
-    index_list = []
-
-    # Get indexes
-    for i in range(1,num_points+1):
-        lower_index = max(0, interval_size*i-interval_size//2)
-        upper_index = min(len(strain_list)-1, interval_size*i+interval_size//2)
-        interval_indexes = range(lower_index, upper_index+1)
-        stress_interval = [stress_list[j] for j in interval_indexes]
-        stress_index = stress_interval.index(max(stress_interval))
-        index_list.append(stress_index + min(interval_indexes))
-
-    # Return
-    return index_list
-
 # Read files
 tensile_dict = csv_to_dict(TENSILE_PATH)
-reorient_dict = csv_to_dict(REORIENTATION_PATH)
+reorient_store = TrajectoryStore.from_csv(REORIENTATION_PATH)
 
 # Convert tensile data
-index_list   = process_tensile(tensile_dict[STRAIN_FIELD], tensile_dict[STRESS_FIELD])
+index_list   = get_peak_indexes(tensile_dict[STRESS_FIELD])
 strain_list  = [tensile_dict[STRAIN_FIELD][i] for i in index_list]
 stress_list  = [tensile_dict[STRESS_FIELD][i] for i in index_list]
 interpolator = Interpolator(strain_list, stress_list)
@@ -69,8 +43,7 @@ stress_list  = [0] + [round_sf(stress, 5) for stress in interpolator.evaluate(st
 time_list    = [round_sf(time, 5) for time in np.linspace(0, max(tensile_dict[TIME_FIELD]), NUM_POINTS)]
 
 # Extend reorientation data
-for key in reorient_dict.keys():
-    reorient_dict[key] = reorient_dict[key] + [reorient_dict[key][-1]]*(len(strain_list)-len(reorient_dict[key]))
+reorient_dict = reorient_store.pad(len(strain_list)).to_dict()
 
 # Create tensile dictionary
 tc_dict = {
@@ -8,7 +8,7 @@
 # Libraries
 import sys; sys.path += [".."]
 import matplotlib.pyplot as plt
-from crystalyser.helper import read_excel, remove_nan, csv_to_dict, get_closest, dict_to_csv, get_thinned_list, round_sf
+from crystalyser.helper import read_excel, remove_nan, csv_to_dict, get_closest_array, dict_to_csv, get_thinned_list, round_sf
 
 # Input Paths
 SS_PATH  = "/mnt/c/Users/janzen/OneDrive - UNSW/PhD/data/2024-06-26 (ansto_617_s3)/sscurve_corrected_janzen_3.xlsx"
@@ -32,7 +32,7 @@ strain_intervals = read_excel(SS_PATH, "Sheet1", 14)[1:] # exclude header
 strain_intervals = remove_nan(strain_intervals)
 stress_intervals = read_excel(SS_PATH, "Sheet1", 15)[1:] # exclude header
 stress_intervals = remove_nan(stress_intervals)
-time_intervals   = [get_closest(strain_list, time_list, strain) for strain in strain_intervals]
+time_intervals   = list(get_closest_array(strain_list, time_list, strain_intervals)[0])
 
 # Thin the stress-strain information
 time_list   = get_thinned_list(time_list, THIN_AMOUNT)
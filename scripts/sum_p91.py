@@ -6,10 +6,13 @@
 """
 
 # Libraries
-import math
 import sys; sys.path += [".."]
+import numpy as np
 from crystalyser.helper import csv_to_dict, dict_to_csv, round_sf, read_excel, get_sorted
 from crystalyser.orientation import deg_to_rad
+from crystalyser.orientations import Orientations
+from crystalyser.tensile import get_true_curve
+from crystalyser.trajectory import get_trajectories
 
 # Index to control which data to access
 SAMPLE_INDEX = int(sys.argv[1])
@@ -65,48 +68,11 @@ OUTPUT_GRAINS  = f"{OUTPUT_FOLDER}/p91_s{SAMPLE_INDEX+1}_grains"
 YOUNGS   = 190000 # MPa
 POISSONS = 0.28
 
-def truify(strain_list:list, stress_list:list) -> tuple:
-    """
-    Converts engineering strain and stress into true strain and stress
-
-    Parameters:
-    * `strain_list`: Engineering strains
-    * `stress_list`: Engineering stresses
-
-    Returns true strain and stress as lists
-    """
-    true_strain_list, true_stress_list = [], []
-    for i in range(len(strain_list)):
-        true_strain = math.log(1+strain_list[i])
-        true_stress = stress_list[i]*(1+strain_list[i])
-        true_strain_list.append(true_strain)
-        true_stress_list.append(true_stress)
-    return true_strain_list, true_stress_list
-
-def get_trajectory(strain_list:list, start:float, end:float) -> list:
-    """
-    Gets the linear trajectory an orientation
-
-    Parameters:
-    * `strain_list`: Strains
-    * `start`:      Orientation starting value (deg)
-    * `end`:        Orientation ending value (deg)
-    
-    Returns the orientation values (rad)
-    """
-    min_strain = min(strain_list)
-    max_strain = max(strain_list)
-    gradient = (end-start)/(max_strain-min_strain)
-    linear = lambda x : gradient*(x-min_strain) + start
-    orientation_list = [linear(strain) for strain in strain_list]
-    orientation_list = deg_to_rad(orientation_list)
-    return orientation_list
-
 # Read and process tensile data
 time_list   = read_excel(TENSILE_PATH, TENSILE_SHEET, TENSILE_TIME)
 strain_list = read_excel(TENSILE_PATH, TENSILE_SHEET, TENSILE_STRAIN)
 stress_list = read_excel(TENSILE_PATH, TENSILE_SHEET, TENSILE_STRESS)
-strain_list, stress_list = truify(strain_list, stress_list)
+strain_list, stress_list = [list(curve) for curve in get_true_curve(strain_list, stress_list)]
 strain_rate = round_sf(max(strain_list)/max(time_list), 7)
 
 # Read and process start CSV
@@ -124,12 +90,17 @@ grain_end_phi_2  = grain_end_dict[GRAIN_PHI_2]
 grain_end_weight = grain_end_dict[GRAIN_WEIGHT]
 
 # Get grain trajectories of grains we can map
+start_indexes = np.array(list(GRAIN_MAP.keys())) - 1
+end_indexes   = np.array(list(GRAIN_MAP.values())) - 1
+start_eulers  = np.array([grain_start_phi_1, grain_start_Phi, grain_start_phi_2]).T[start_indexes]
+end_eulers    = np.array([grain_end_phi_1, grain_end_Phi, grain_end_phi_2]).T[end_indexes]
+keyframes     = [Orientations(start_eulers, degrees=True), Orientations(end_eulers, degrees=True)]
+trajectories  = get_trajectories(keyframes, [min(strain_list), max(strain_list)], strain_list, "cubic")
 tensile_grain_dict = {}
-for start_index in GRAIN_MAP.keys():
-    end_index = GRAIN_MAP[start_index]
-    tensile_grain_dict[f"g{start_index}_phi_1"] = get_trajectory(strain_list, grain_start_phi_1[start_index-1], grain_end_phi_1[end_index-1])
-    tensile_grain_dict[f"g{start_index}_Phi"]   = get_trajectory(strain_list, grain_start_Phi[start_index-1],   grain_end_Phi[end_index-1])
-    tensile_grain_dict[f"g{start_index}_phi_2"] = get_trajectory(strain_list, grain_start_phi_2[start_index-1], grain_end_phi_2[end_index-1])
+for i, start_index in enumerate(GRAIN_MAP.keys()):
+    tensile_grain_dict[f"g{start_index}_phi_1"] = list(trajectories[:,i,0])
+    tensile_grain_dict[f"g{start_index}_Phi"]   = list(trajectories[:,i,1])
+    tensile_grain_dict[f"g{start_index}_phi_2"] = list(trajectories[:,i,2])
 
 # Create dictionaries for tensile data
 tensile_curve_dict = {